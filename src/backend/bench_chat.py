@@ -0,0 +1,87 @@
+# src/backend/bench_chat.py
+"""Measures per-turn chat prefill time with and without server-side sessions.
+
+Run against a live backend (and Ollama):
+    python bench_chat.py --url http://localhost:8000 --turns 8
+"""
+import argparse
+import statistics
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+QUESTIONS = [
+    "What should I do first when moving abroad?",
+    "How early should I book international movers?",
+    "Do I need to do anything special for my pets?",
+    "What documents should I carry with me on the flight?",
+    "How do I get a phone plan when I arrive?",
+    "When should I close my bank accounts?",
+    "What about shipping my car?",
+    "Any tips for the first week after arriving?",
+]
+
+
+def run_turns(client: httpx.Client, url: str, turns: int, use_session: bool) -> List[Dict[str, Any]]:
+    history: List[Dict[str, str]] = []
+    session_id = None
+    if use_session:
+        session_id = client.post(f"{url}/chat/sessions", json={}).json()["session_id"]
+
+    results = []
+    for turn in range(turns):
+        message = QUESTIONS[turn % len(QUESTIONS)]
+        body: Dict[str, Any] = {"message": message}
+        if use_session:
+            body["session_id"] = session_id
+        else:
+            body["history"] = history
+
+        started = time.perf_counter()
+        response = client.post(f"{url}/chat", json=body)
+        response.raise_for_status()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        data = response.json()
+
+        if not use_session:
+            history = history + [{'role': 'user', 'content': message}, {'role': 'assistant', 'content': data["response"]}]
+
+        timings = data.get("timings") or {}
+        results.append({
+            "turn": turn + 1,
+            "request_bytes": len(response.request.content),
+            "prompt_eval_count": timings.get("prompt_eval_count"),
+            "prompt_eval_ms": timings.get("prompt_eval_ms"),
+            "wall_ms": round(elapsed_ms, 1),
+        })
+
+    if use_session:
+        client.delete(f"{url}/chat/sessions/{session_id}")
+    return results
+
+
+def print_results(label: str, results: List[Dict[str, Any]]) -> None:
+    print(f"\n== {label} ==")
+    print(f"{'turn':>4} {'req bytes':>10} {'prefill tok':>12} {'prefill ms':>11} {'wall ms':>9}")
+    for r in results:
+        print(f"{r['turn']:>4} {r['request_bytes']:>10} {str(r['prompt_eval_count']):>12} "
+              f"{str(r['prompt_eval_ms']):>11} {r['wall_ms']:>9}")
+    prefill = [r["prompt_eval_ms"] for r in results[1:] if r["prompt_eval_ms"] is not None]
+    if prefill:
+        print(f"median prefill ms (turns 2+): {statistics.median(prefill):.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--turns", type=int, default=6)
+    args = parser.parse_args()
+
+    with httpx.Client(timeout=300) as client:
+        print_results("stateless (full history each turn)", run_turns(client, args.url, args.turns, use_session=False))
+        print_results("server-side session", run_turns(client, args.url, args.turns, use_session=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# src/backend/bench_gazetteer.py
+"""Measures destination canonicalization on synthetic free-text input: accuracy, personalization cache hit rate and latency.
+
+    python bench_gazetteer.py --samples 20000 --move-days 180
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+from typing import Any, List, Tuple
+
+import yaml
+
+from gazetteer import Gazetteer
+from response_cache import CoalescingCache
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+GAZETTEER_DATA_PATH = os.path.join(BASE_DIR, 'Checklists', 'gazetteer.yaml')
+
+
+def typo(text: str, rng: random.Random) -> str:
+    if len(text) < 5:
+        return text
+    i = rng.randrange(1, len(text) - 1)
+    return text[:i] + text[i + 1:] if rng.random() < 0.5 else text[:i] + text[i + 1] + text[i] + text[i + 2:]
+
+
+def synthesize(entries: List[dict], samples: int, seed: int) -> List[Tuple[str, str]]:
+    """Returns (free-text destination, expected country code), with Zipf-like country popularity."""
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(entries))]
+    out = []
+    for entry in rng.choices(entries, weights=weights, k=samples):
+        name = entry["name"]
+        cities = [r["name"] for r in entry.get("regions", []) if not r.get("code")]
+        city = rng.choice(cities) if cities else name
+        variant = rng.choice([
+            name, name.lower(), name.upper(), f" {name} ", f"{name}.", entry["code"], entry["code"].lower(),
+            entry.get("iso3", name), rng.choice(entry.get("aliases") or [name]).title(),
+            f"{city}, {name}", f"{city.lower()}, {entry['code']}", city, typo(name, rng),
+        ])
+        out.append((variant, entry["code"]))
+    return out
+
+
+def synthetic_quiz(rng: random.Random) -> Tuple[Any, ...]:
+    """The non-destination, non-date quiz answers that go into the personalization prompt's user context."""
+    has_housing = rng.random() < 0.4
+    return (
+        rng.random() < 0.3, rng.random() < 0.3,  # children, pets
+        rng.choice(["bring", "rent", "none"]),
+        rng.choice(["own", "rent", ""]),
+        rng.choice(["own", "rent", "temporary"]) if has_housing else "",
+        rng.random() < 0.6,  # hasJob
+    )
+
+
+def prompt_destination(gazetteer: Gazetteer, text: str) -> str:
+    """Destination text as personalize_explanation_with_llm puts it in the prompt."""
+    canonical = gazetteer.canonicalize(text)
+    if canonical is None:
+        return text.strip()
+    if canonical.region_name is None:
+        return canonical.country_name
+    return f"{canonical.region_name}, {canonical.country_name}"
+
+
+async def cache_hit_rate(keys: List[Tuple[Any, ...]], cache_size: int) -> float:
+    cache = CoalescingCache(cache_size)
+
+    async def compute() -> str:
+        return "personalized"
+
+    for key in keys:
+        await cache.get_or_compute(key, compute)
+    return cache.snapshot()["hit_rate"] or 0.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=20000)
+    parser.add_argument("--move-days", type=int, default=180, help="Users move within this many days")
+    parser.add_argument("--tasks", type=int, default=10, help="Personalized tasks per request")
+    parser.add_argument("--cache-size", type=int, default=int(os.getenv("PERSONALIZATION_CACHE_SIZE", 16384)))
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with open(GAZETTEER_DATA_PATH, 'r', encoding='utf-8') as f:
+        entries = yaml.safe_load(f)
+    build_started = time.perf_counter()
+    gazetteer = Gazetteer(entries)
+    print(f"Index built in {(time.perf_counter() - build_started) * 1000:.1f}ms ({len(gazetteer.exact)} names)")
+
+    inputs = synthesize(entries, args.samples, args.seed)
+    correct = wrong = 0
+    cold_us, warm_us = [], []
+    for text, expected_code in inputs:
+        hits_before = gazetteer.resolve.cache_info().hits
+        started = time.perf_counter()
+        canonical = gazetteer.canonicalize(text)
+        elapsed_us = (time.perf_counter() - started) * 1e6
+        # Warm means resolve()'s memo already held these normalized parts
+        (warm_us if gazetteer.resolve.cache_info().hits > hits_before else cold_us).append(elapsed_us)
+        if canonical is not None:
+            correct += canonical.country_code == expected_code
+            wrong += canonical.country_code != expected_code
+
+    total = len(inputs)
+    print(f"samples: {total}, correct country: {correct / total:.1%}, wrong country: {wrong / total:.1%}, "
+          f"kept as typed: {(total - correct - wrong) / total:.1%}")
+
+    rng = random.Random(args.seed)
+    quizzes = [synthetic_quiz(rng) for _ in inputs]
+    move_days = [rng.randrange(args.move_days) for _ in inputs]
+    raw = [text.strip() for text, _ in inputs]
+    canonical = [prompt_destination(gazetteer, text) for text, _ in inputs]
+    # Same key shape as personalize_explanation_with_llm: destination text, move date, rest of the quiz, task
+    keyings = {
+        "raw destination, move day": (raw, move_days),
+        "canonical destination, move day": (canonical, move_days),
+        "canonical destination, move month (served)": (canonical, [day // 30 for day in move_days]),
+    }
+    print(f"personalization cache hit rate ({args.tasks} tasks/request, LRU size {args.cache_size}):")
+    for label, (destinations, dates) in keyings.items():
+        keys = [(d, date, quiz, task) for d, date, quiz in zip(destinations, dates, quizzes) for task in range(args.tasks)]
+        print(f"  {label:<44} {asyncio.run(cache_hit_rate(keys, args.cache_size)):.1%}")
+
+    for label, samples in (("cold", cold_us), ("warm", warm_us)):
+        if samples:
+            samples.sort()
+            p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+            print(f"canonicalize latency {label} ({len(samples)}): p50 {statistics.median(samples):.1f}us  p99 {p99:.1f}us")
+
+
+if __name__ == "__main__":
+    main()
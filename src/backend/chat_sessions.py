@@ -0,0 +1,86 @@
+# src/backend/chat_sessions.py
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+
+@dataclass
+class ChatSession:
+    session_id: str
+    system_prompt: str  # Pinned at creation so every turn shares a byte-identical prompt prefix
+    user_id: Optional[str] = None
+    messages: List[Dict[str, str]] = field(default_factory=list)
+    created_at: float = field(default_factory=time.time)
+    last_used: float = field(default_factory=time.time)
+
+    def prompt_messages(self) -> List[Dict[str, str]]:
+        return [{'role': 'system', 'content': self.system_prompt}] + self.messages
+
+
+class ChatSessionStore:
+    """Server-held chat histories with LRU size eviction and idle TTL eviction.
+
+    Each history is bounded by message count and by total characters, so the prompt stays inside the
+    model's context window; past that Ollama truncates from the front, dropping the pinned system prompt.
+    """
+
+    def __init__(self, max_sessions: int = 500, ttl_seconds: float = 1800, max_messages: int = 40,
+                 max_history_chars: int = 6000):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_messages = max_messages
+        self.max_history_chars = max_history_chars
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict_expired(self, now: float) -> None:
+        # Sessions are kept in least-recently-used order, so expired ones sit at the front
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_used < self.ttl_seconds:
+                break
+            self._sessions.popitem(last=False)
+
+    def create(self, system_prompt: str, user_id: Optional[str] = None) -> ChatSession:
+        now = time.time()
+        session = ChatSession(session_id=uuid.uuid4().hex, system_prompt=system_prompt, user_id=user_id)
+        with self._lock:
+            self._evict_expired(now)
+            while len(self._sessions) >= self.max_sessions:
+                self._sessions.popitem(last=False)
+            self._sessions[session.session_id] = session
+        return session
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        now = time.time()
+        with self._lock:
+            self._evict_expired(now)
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.last_used = now
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def append_turn(self, session: ChatSession, user_message: str, assistant_message: str) -> None:
+        with self._lock:
+            session.messages.append({'role': 'user', 'content': user_message})
+            session.messages.append({'role': 'assistant', 'content': assistant_message})
+            history_chars = sum(len(m['content']) for m in session.messages)
+            if len(session.messages) > self.max_messages or history_chars > self.max_history_chars:
+                # Drop the oldest turns down to half of each limit in one go rather than one turn per
+                # call, so the cached prompt prefix is invalidated rarely instead of on every turn.
+                while session.messages and (len(session.messages) > self.max_messages // 2
+                                            or history_chars > self.max_history_chars // 2):
+                    history_chars -= sum(len(m['content']) for m in session.messages[:2])
+                    del session.messages[:2]
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
@@ -0,0 +1,213 @@
+# src/backend/checklist_store.py
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from models import FirestoreRelocationTask
+
+STAGES = ("predeparture", "departure", "arrival")
+
+# Columns that UpdateTaskStatePayload is allowed to touch
+UPDATABLE_FIELDS = ("completed", "isImportant", "notes", "task_description", "due_date")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checklist_tasks (
+    user_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    category TEXT NOT NULL,
+    task_description TEXT NOT NULL,
+    priority TEXT NOT NULL,
+    due_date TEXT NOT NULL,
+    importance_explanation TEXT,
+    recommended_services TEXT NOT NULL DEFAULT '[]',
+    completed INTEGER NOT NULL DEFAULT 0,
+    isImportant INTEGER NOT NULL DEFAULT 0,
+    notes TEXT DEFAULT '',
+    is_custom INTEGER NOT NULL DEFAULT 0,
+    position INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (user_id, task_id)
+);
+CREATE INDEX IF NOT EXISTS idx_checklist_user_stage
+    ON checklist_tasks (user_id, stage, position);
+"""
+
+
+class ChecklistStore:
+    """SQLite-backed per-user checklist storage (WAL mode, one shared connection)."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        # A single connection guarded by a lock; calls are dispatched via asyncio.to_thread
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # --- Internal helpers ---
+    def _write_transaction(self, statements: Iterable[Tuple[str, Tuple[Any, ...]]]) -> List[int]:
+        """Runs all statements inside one BEGIN IMMEDIATE transaction, returning per-statement rowcounts."""
+        rowcounts: List[int] = []
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params in statements:
+                    cur.execute(sql, params)
+                    rowcounts.append(cur.rowcount)
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+        return rowcounts
+
+    @staticmethod
+    def _row_to_task(row: sqlite3.Row) -> FirestoreRelocationTask:
+        return FirestoreRelocationTask(
+            task_id=row["task_id"],
+            task_description=row["task_description"],
+            priority=row["priority"],
+            due_date=row["due_date"],
+            importance_explanation=row["importance_explanation"],
+            recommended_services=json.loads(row["recommended_services"] or "[]"),
+            stage=row["stage"],
+            category=row["category"],
+            completed=bool(row["completed"]),
+            isImportant=bool(row["isImportant"]),
+            notes=row["notes"] or "",
+            is_custom=bool(row["is_custom"]),
+        )
+
+    @staticmethod
+    def _update_statement(user_id: str, task_id: str, changes: Dict[str, Any]) -> Optional[Tuple[str, Tuple[Any, ...]]]:
+        fields = [f for f in UPDATABLE_FIELDS if changes.get(f) is not None]
+        if not fields:
+            return None
+        assignments = ", ".join(f"{f} = ?" for f in fields) + ", updated_at = ?"
+        values = tuple(int(changes[f]) if isinstance(changes[f], bool) else changes[f] for f in fields)
+        return (
+            f"UPDATE checklist_tasks SET {assignments} WHERE user_id = ? AND task_id = ?",
+            values + (time.time(), user_id, task_id),
+        )
+
+    # --- Reads ---
+    def get_checklist(self, user_id: str) -> Dict[str, List[FirestoreRelocationTask]]:
+        """Loads a user's full checklist with a single indexed query, grouped by stage."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM checklist_tasks WHERE user_id = ? ORDER BY stage, position",
+                (user_id,),
+            ).fetchall()
+        checklist: Dict[str, List[FirestoreRelocationTask]] = {stage: [] for stage in STAGES}
+        for row in rows:
+            if row["stage"] in checklist:
+                checklist[row["stage"]].append(self._row_to_task(row))
+        return checklist
+
+    def get_task(self, user_id: str, task_id: str) -> Optional[FirestoreRelocationTask]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM checklist_tasks WHERE user_id = ? AND task_id = ?",
+                (user_id, task_id),
+            ).fetchone()
+        return self._row_to_task(row) if row else None
+
+    # --- Writes ---
+    def save_generated_tasks(self, user_id: str, tasks: List[Dict[str, Any]]) -> int:
+        """Replaces a user's generated tasks in one transaction.
+
+        Tasks that are still generated keep their per-user state (completed, notes, ...); generated tasks
+        no longer in the set (e.g. after switching from an international to a domestic move) are removed.
+        Custom tasks are never touched.
+        """
+        now = time.time()
+        task_ids = [task["task_id"] for task in tasks]
+        placeholders = ", ".join("?" for _ in task_ids)
+        statements = [(
+            "DELETE FROM checklist_tasks WHERE user_id = ? AND is_custom = 0"
+            + (f" AND task_id NOT IN ({placeholders})" if task_ids else ""),
+            (user_id, *task_ids),
+        )]
+        for position, task in enumerate(tasks):
+            statements.append((
+                """
+                INSERT INTO checklist_tasks (
+                    user_id, task_id, stage, category, task_description, priority, due_date,
+                    importance_explanation, recommended_services, is_custom, position, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0, ?, ?)
+                ON CONFLICT(user_id, task_id) DO UPDATE SET
+                    stage = excluded.stage,
+                    category = excluded.category,
+                    priority = excluded.priority,
+                    importance_explanation = excluded.importance_explanation,
+                    recommended_services = excluded.recommended_services,
+                    position = excluded.position,
+                    updated_at = excluded.updated_at
+                """,
+                (
+                    user_id, task["task_id"], task["stage"], task["category"], task["task_description"],
+                    task["priority"], task["due_date"], task.get("importance_explanation"),
+                    json.dumps(task.get("recommended_services", [])), position, now,
+                ),
+            ))
+        self._write_transaction(statements)
+        return len(tasks)
+
+    def add_custom_task(self, user_id: str, task: FirestoreRelocationTask) -> FirestoreRelocationTask:
+        # The next position is read inside the INSERT so concurrent adds can't claim the same one
+        self._write_transaction([(
+            """
+            INSERT INTO checklist_tasks (
+                user_id, task_id, stage, category, task_description, priority, due_date,
+                importance_explanation, recommended_services, completed, isImportant, notes,
+                is_custom, position, updated_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1, (
+                SELECT COALESCE(MAX(position), -1) + 1 FROM checklist_tasks WHERE user_id = ? AND stage = ?
+            ), ?)
+            """,
+            (
+                user_id, task.task_id, task.stage, task.category, task.task_description, task.priority,
+                task.due_date, task.importance_explanation,
+                json.dumps([s.model_dump() for s in task.recommended_services]),
+                int(task.completed), int(task.isImportant), task.notes or "", user_id, task.stage, time.time(),
+            ),
+        )])
+        return task
+
+    def update_task(self, user_id: str, task_id: str, changes: Dict[str, Any]) -> bool:
+        """Applies a partial state update. Returns False if the task does not exist."""
+        statement = self._update_statement(user_id, task_id, changes)
+        if statement is None:
+            return self.get_task(user_id, task_id) is not None
+        return self._write_transaction([statement])[0] > 0
+
+    def bulk_update_tasks(self, user_id: str, updates: List[Tuple[str, Dict[str, Any]]]) -> Tuple[List[str], List[str]]:
+        """Applies many partial updates in one write transaction. Returns (updated_ids, missing_ids)."""
+        statements = []
+        statement_task_ids = []
+        noop_task_ids = []
+        for task_id, changes in updates:
+            statement = self._update_statement(user_id, task_id, changes)
+            if statement is None:
+                noop_task_ids.append(task_id)
+                continue
+            statements.append(statement)
+            statement_task_ids.append(task_id)
+
+        rowcounts = self._write_transaction(statements) if statements else []
+        updated = [tid for tid, count in zip(statement_task_ids, rowcounts) if count > 0]
+        missing = [tid for tid, count in zip(statement_task_ids, rowcounts) if count == 0]
+        for task_id in dict.fromkeys(noop_task_ids):
+            (updated if self.get_task(user_id, task_id) else missing).append(task_id)
+        # A task ID sent more than once is reported once
+        return list(dict.fromkeys(updated)), list(dict.fromkeys(missing))
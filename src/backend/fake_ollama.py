@@ -0,0 +1,71 @@
+# src/backend/fake_ollama.py
+"""Minimal fake Ollama server for exercising the backend pool locally without a GPU.
+
+Start a few on different ports, then point the backend at them:
+    python fake_ollama.py --port 11435 --tokens-per-second 40 &
+    python fake_ollama.py --port 11436 --tokens-per-second 15 --fail-rate 0.2 &
+    OLLAMA_HOSTS=http://127.0.0.1:11435,http://127.0.0.1:11436 uvicorn main:app --port 8000
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+from fastapi import FastAPI, HTTPException
+
+REPLY = "This task matters for your move because it keeps your plans on schedule and avoids surprises on arrival."
+
+
+def create_app(name: str, tokens_per_second: float, prefill_ms: float, fail_rate: float) -> FastAPI:
+    fake = FastAPI(title=f"Fake Ollama ({name})")
+
+    @fake.get("/api/version")
+    async def version():
+        return {"version": f"fake-{name}"}
+
+    @fake.get("/api/tags")
+    async def tags():
+        return {"models": []}
+
+    @fake.post("/api/chat")
+    async def chat(payload: Dict[str, Any]):
+        if random.random() < fail_rate:
+            raise HTTPException(status_code=500, detail=f"{name}: injected failure")
+        started = time.perf_counter()
+        eval_count = len(REPLY.split()) * 2
+        await asyncio.sleep(prefill_ms / 1000)
+        await asyncio.sleep(eval_count / tokens_per_second)
+        total_ns = int((time.perf_counter() - started) * 1e9)
+        return {
+            "model": payload.get("model", "fake"),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "message": {"role": "assistant", "content": f"{REPLY} (served by {name})"},
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": total_ns,
+            "prompt_eval_count": sum(len(m.get("content", "").split()) for m in payload.get("messages", [])),
+            "prompt_eval_duration": int(prefill_ms * 1e6),
+            "eval_count": eval_count,
+            "eval_duration": int(eval_count / tokens_per_second * 1e9),
+        }
+
+    return fake
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake Ollama server")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--tokens-per-second", type=float, default=30.0)
+    parser.add_argument("--prefill-ms", type=float, default=50.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    uvicorn.run(
+        create_app(f"node-{args.port}", args.tokens_per_second, args.prefill_ms, args.fail_rate),
+        host="127.0.0.1",
+        port=args.port,
+    )
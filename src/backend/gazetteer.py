@@ -0,0 +1,131 @@
+# src/backend/gazetteer.py
+import re
+import unicodedata
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+_PART_SPLIT_RE = re.compile(r"\s*(?:,|/|;|\s-\s|\(|\))\s*")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercases, strips accents and punctuation and collapses whitespace ("  Zürich!" -> "zurich")."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    ascii_text = "".join(ch for ch in decomposed if not unicodedata.combining(ch)).lower()
+    return _NON_ALNUM_RE.sub(" ", ascii_text).strip()
+
+
+@dataclass(frozen=True)
+class Place:
+    country_code: str
+    country_name: str
+    region_name: Optional[str] = None  # None for a country entry
+    is_subdivision: bool = False       # State/province rather than a city
+
+    @property
+    def is_country(self) -> bool:
+        return self.region_name is None
+
+
+@dataclass(frozen=True)
+class CanonicalDestination:
+    key: str                    # Stable cache key, e.g. "DE" or "DE/berlin"
+    country_code: str
+    country_name: str
+    region_name: Optional[str]
+
+
+class Gazetteer:
+    """In-memory destination index over normalized names, aliases and ISO codes.
+
+    Built once from the gazetteer YAML entries; resolve() results are memoized per normalized input
+    (the tuple of normalized comma/slash-separated parts). Only listed names match: the result is shown
+    to users and put into LLM prompts, so a guess at a misspelled name would do more harm than keeping
+    the destination as typed.
+    """
+
+    def __init__(self, entries: List[Dict[str, Any]], cache_size: int = 4096):
+        self.exact: Dict[str, List[Place]] = {}
+        self.short_codes: Dict[str, List[Place]] = {}  # Region codes, only trusted alongside another part
+        for entry in entries:
+            self._add_country(entry)
+        self.resolve = lru_cache(maxsize=cache_size)(self._resolve_uncached)  # type: ignore[method-assign]
+
+    def _add_name(self, name: str, place: Place) -> None:
+        key = normalize_text(name)
+        if key and place not in self.exact.setdefault(key, []):
+            self.exact[key].append(place)
+
+    def _add_country(self, entry: Dict[str, Any]) -> None:
+        code, name = entry.get("code"), entry.get("name")
+        if not code or not name:
+            print(f"WARNING: Gazetteer entry missing 'code' or 'name': {entry}. Skipping.")
+            return
+        country = Place(code, name)
+        for alias in [name, code, entry.get("iso3", "")] + list(entry.get("aliases", [])):
+            if alias:
+                self._add_name(str(alias), country)
+        for region in entry.get("regions", []) or []:
+            region_place = Place(code, name, region["name"], bool(region.get("code") or region.get("subdivision")))
+            for alias in [region["name"]] + list(region.get("aliases", [])):
+                self._add_name(str(alias), region_place)
+            if region.get("code"):
+                self.short_codes.setdefault(normalize_text(region["code"]), []).append(region_place)
+
+    # --- Lookup ---
+    def _resolve_uncached(self, parts: Tuple[str, ...]) -> Optional[CanonicalDestination]:
+        if not parts:
+            return None
+        if len(parts) == 1:
+            places = self.exact.get(parts[0], [])
+            if not places:
+                return None
+            # A bare name matching both a country and a region ("CA", "Georgia") means the country
+            place = next((p for p in places if p.is_country), places[0])
+            return self._canonical(place.country_code, place.country_name, place.region_name)
+
+        # Several parts ("Berlin, Germany", "Austin, TX"): pick the country most parts agree on
+        part_matches = [list(self.exact.get(part, [])) for part in parts]
+        votes: Dict[Tuple[str, str], int] = {}
+        for places in part_matches:
+            for country in {(p.country_code, p.country_name) for p in places}:
+                votes[country] = votes.get(country, 0) + 1
+        if not votes:
+            return None
+        # Short region codes ("TX", "DE" as Delaware) only count for a country another part already named
+        for index, part in enumerate(parts):
+            agreeing = [p for p in self.short_codes.get(part, []) if (p.country_code, p.country_name) in votes]
+            if agreeing:
+                part_matches[index] += agreeing
+                for country in {(p.country_code, p.country_name) for p in agreeing}:
+                    votes[country] += 1
+        # Ties go to the country named last (addresses usually end with the country)
+        country_order = [(p.country_code, p.country_name) for places in part_matches for p in places]
+        best = max(votes, key=lambda c: (votes[c], max(i for i, cc in enumerate(country_order) if cc == c)))
+        # Every part must fit that country; silently dropping one ("Portland" in "Portland, OR",
+        # "Paris" in "Paris, Texas") would turn the destination into a different place
+        if any(all((p.country_code, p.country_name) != best for p in places) for places in part_matches):
+            return None
+        regions: List[Place] = []
+        for places in part_matches:
+            for place in places:
+                if (place.country_code, place.country_name) == best and place.region_name is not None \
+                        and place not in regions:
+                    regions.append(place)
+        # Parts naming different regions: a city beats its state ("Austin, TX", "Washington, DC");
+        # two cities or two states can't both be right, so only the country is kept
+        cities = [p for p in regions if not p.is_subdivision]
+        candidates = cities or regions
+        region_name = candidates[0].region_name if len(candidates) == 1 else None
+        return self._canonical(best[0], best[1], region_name)
+
+    @staticmethod
+    def _canonical(country_code: str, country_name: str, region_name: Optional[str]) -> CanonicalDestination:
+        key = country_code if region_name is None else f"{country_code}/{normalize_text(region_name)}"
+        return CanonicalDestination(key, country_code, country_name, region_name)
+
+    def canonicalize(self, destination: Optional[str]) -> Optional[CanonicalDestination]:
+        """Maps free-text destination to its canonical country/region, or None if unrecognized."""
+        parts = tuple(part for part in (normalize_text(p) for p in _PART_SPLIT_RE.split(destination or "")) if part)
+        return self.resolve(parts)
@@ -0,0 +1,93 @@
+# src/backend/llm_budget.py
+import time
+from typing import Any, Dict, List, Optional
+
+PRIORITY_RANK = {"High": 0, "Medium": 1, "Low": 2}
+STAGE_RANK = {"predeparture": 0, "departure": 1, "arrival": 2}
+
+
+def personalization_rank_key(task_template: Dict[str, Any]) -> tuple:
+    """Value order for spending the LLM budget: High priority first, then earliest stage."""
+    return (
+        PRIORITY_RANK.get(task_template.get("priority", "Low"), 99),
+        STAGE_RANK.get(task_template.get("stage", "unknown"), 99),
+    )
+
+
+class PersonalizationBudget:
+    """Per-request LLM budget (wall-clock seconds and/or number of calls) spent in value order.
+
+    Candidates are ranked up front. When a task asks to be personalized, it is only allowed if the
+    budget left after reserving room for every still-undecided higher-ranked candidate is enough for
+    one more call, so tasks streamed early never starve more valuable tasks streamed later.
+    A limit of None or 0 means unlimited.
+    """
+
+    def __init__(self, ranked_task_ids: List[str], max_seconds: Optional[float] = None, max_calls: Optional[int] = None):
+        self.max_seconds = max_seconds or None
+        self.max_calls = max_calls or None
+        self.rank = {task_id: position for position, task_id in enumerate(ranked_task_ids)}
+        self.undecided = set(ranked_task_ids)
+        self.started_at = time.monotonic()
+        self.calls_started = 0
+        self.calls_finished = 0
+        self.llm_seconds = 0.0
+        self.skipped_task_ids: List[str] = []
+
+    @property
+    def unlimited(self) -> bool:
+        return self.max_seconds is None and self.max_calls is None
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def _estimated_call_seconds(self) -> float:
+        return self.llm_seconds / self.calls_finished if self.calls_finished else 0.0
+
+    def try_acquire(self, task_id: str) -> bool:
+        """Decides whether task_id may be personalized now. Every candidate must be decided exactly once."""
+        self.undecided.discard(task_id)
+        if self.unlimited:
+            self.calls_started += 1
+            return True
+
+        my_rank = self.rank.get(task_id, len(self.rank))
+        reserved = sum(1 for other in self.undecided if self.rank[other] < my_rank)
+        allowed = True
+        if self.max_calls is not None and self.calls_started + reserved >= self.max_calls:
+            allowed = False
+        if self.max_seconds is not None:
+            estimate = self._estimated_call_seconds()
+            remaining = self.max_seconds - self.elapsed()
+            if remaining <= 0 or remaining < estimate * (reserved + 1):
+                allowed = False
+
+        if allowed:
+            self.calls_started += 1
+        else:
+            self.skipped_task_ids.append(task_id)
+        return allowed
+
+    def skip(self, task_id: str) -> None:
+        """Marks a candidate as decided without spending budget (e.g. while the LLM is degraded)."""
+        self.undecided.discard(task_id)
+        self.skipped_task_ids.append(task_id)
+
+    def settle(self, task_id: str) -> None:
+        """Marks a candidate as decided without spending budget or skipping it (e.g. served from cache)."""
+        self.undecided.discard(task_id)
+
+    def record_call(self, seconds: float) -> None:
+        self.calls_finished += 1
+        self.llm_seconds += seconds
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "max_seconds": self.max_seconds,
+            "max_calls": self.max_calls,
+            "seconds_used": round(self.elapsed(), 2),
+            "llm_seconds": round(self.llm_seconds, 2),
+            "calls_used": self.calls_started,
+            "tasks_skipped": len(self.skipped_task_ids),
+            "skipped_task_ids": self.skipped_task_ids,
+        }
@@ -0,0 +1,136 @@
+# src/backend/llm_guard.py
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+class CircuitOpenError(Exception):
+    """Raised when an LLM call is rejected because the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for the LLM backend.
+
+    closed    -> calls go through; failures and slow calls are counted.
+    open      -> calls are rejected immediately until reset_timeout has passed.
+    half_open -> a single trial call is let through; success closes, failure re-opens.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.total_failures = 0
+        self.total_rejected = 0
+        self.last_error: Optional[str] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.total_rejected += 1
+            return False
+
+    @property
+    def is_open(self) -> bool:
+        """True while calls would be rejected (degraded mode), without consuming a half-open trial."""
+        with self._lock:
+            if self.state == "open":
+                return time.monotonic() - self.opened_at < self.reset_timeout
+            return self.state == "half_open" and self._trial_in_flight
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != "closed":
+                print(f"Circuit breaker '{self.name}' closed after successful trial call.")
+            self.state = "closed"
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """Gives back a half-open trial whose call was cancelled, without counting it as a failure."""
+        with self._lock:
+            if self.state == "half_open":
+                self._trial_in_flight = False
+
+    def record_failure(self, reason: str) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            self.total_failures += 1
+            self.last_error = reason
+            self._trial_in_flight = False
+            if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+                if self.state != "open":
+                    print(f"WARNING: Circuit breaker '{self.name}' opened ({reason}).")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            retry_in = None
+            if self.state == "open":
+                retry_in = round(max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at)), 1)
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "total_failures": self.total_failures,
+                "total_rejected": self.total_rejected,
+                "last_error": self.last_error,
+                "retry_in_seconds": retry_in,
+            }
+
+
+async def guarded_llm_call(breaker: CircuitBreaker, func: Callable[..., Any], *args: Any,
+                           timeout: float, slow_after: Optional[float] = None,
+                           report_outcome: bool = True, **kwargs: Any) -> Any:
+    """Runs a blocking LLM call in a worker thread under a deadline, reporting the outcome to the breaker.
+
+    Raises CircuitOpenError if the breaker rejects the call and asyncio.TimeoutError past the deadline.
+    A call that succeeds but takes longer than slow_after still returns its result, but counts as a failure.
+    With report_outcome=False (e.g. a downgraded fallback model) the call is still gated by the breaker
+    but its outcome doesn't move it; a half-open trial it was given is handed back.
+    """
+    if not breaker.allow_request():
+        raise CircuitOpenError(f"LLM circuit '{breaker.name}' is open")
+
+    def record_failure(reason: str) -> None:
+        if report_outcome:
+            breaker.record_failure(reason)
+        else:
+            breaker.release_trial()
+
+    started = time.monotonic()
+    try:
+        result = await asyncio.wait_for(asyncio.to_thread(func, *args, **kwargs), timeout=timeout)
+    except asyncio.TimeoutError:
+        record_failure(f"deadline of {timeout}s exceeded")
+        raise
+    except asyncio.CancelledError:
+        # The caller went away (client disconnect); this says nothing about the LLM's health, but a
+        # half-open trial must be released or the breaker would never let another call through
+        breaker.release_trial()
+        raise
+    except Exception as e:
+        record_failure(f"{type(e).__name__}: {e}")
+        raise
+
+    elapsed = time.monotonic() - started
+    if slow_after is not None and elapsed > slow_after:
+        record_failure(f"slow response ({elapsed:.1f}s > {slow_after}s)")
+    elif report_outcome:
+        breaker.record_success()
+    else:
+        breaker.release_trial()
+    return result
@@ -0,0 +1,148 @@
+# src/backend/llm_pool.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import httpx
+import ollama
+
+
+class OllamaNode:
+    def __init__(self, host: str, timeout: float):
+        self.host = host.rstrip("/")
+        self.client = ollama.Client(host=self.host, timeout=timeout)
+        self.healthy = True
+        self.outstanding = 0
+        self.tokens_per_second: Optional[float] = None  # EWMA of observed generation speed
+        self.total_requests = 0
+        self.total_failures = 0
+        self.last_error: Optional[str] = None
+
+
+class OllamaPool:
+    """Routes Ollama chat calls across several backends.
+
+    Nodes are chosen by least outstanding requests, weighted by observed tokens/s, among nodes that
+    passed the last health check. Calls with a sticky_key (chat sessions) keep going to the same node
+    while it is healthy, so its KV cache can be reused. Idempotent calls are retried on another node.
+    """
+
+    def __init__(self, hosts: List[str], timeout: float, health_interval: float = 10.0,
+                 max_sticky_keys: int = 1000, ewma_alpha: float = 0.3):
+        if not hosts:
+            raise ValueError("OllamaPool needs at least one host")
+        self.nodes = [OllamaNode(host, timeout) for host in hosts]
+        self.health_interval = health_interval
+        self.max_sticky_keys = max_sticky_keys
+        self.ewma_alpha = ewma_alpha
+        self._sticky: "OrderedDict[str, OllamaNode]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._health_thread: Optional[threading.Thread] = None
+
+    # --- Health checks ---
+    def check_health(self) -> None:
+        for node in self.nodes:
+            try:
+                httpx.get(f"{node.host}/api/version", timeout=2.0).raise_for_status()
+                healthy, error = True, None
+            except Exception as e:
+                healthy, error = False, f"health check failed: {e}"
+            with self._lock:
+                if node.healthy != healthy:
+                    print(f"{'INFO' if healthy else 'WARNING'}: Ollama node {node.host} is now {'healthy' if healthy else 'unhealthy'}.")
+                node.healthy = healthy
+                if error:
+                    node.last_error = error
+
+    def start_health_checks(self) -> None:
+        if self._health_thread is not None or len(self.nodes) < 2:
+            return # A single node has nowhere else to route; the circuit breaker covers it
+
+        def loop():
+            while True:
+                self.check_health()
+                time.sleep(self.health_interval)
+
+        self._health_thread = threading.Thread(target=loop, name="ollama-health", daemon=True)
+        self._health_thread.start()
+
+    # --- Routing ---
+    def _score(self, node: OllamaNode) -> tuple:
+        # Lower is better: queue position divided by relative speed. An unmeasured node is assumed as fast
+        # as the fastest known one and wins ties, then the least used node does, so every node gets explored.
+        known = [n.tokens_per_second for n in self.nodes if n.tokens_per_second]
+        speed = node.tokens_per_second or (max(known) if known else 1.0)
+        return ((node.outstanding + 1) / max(speed, 1e-6), node.tokens_per_second is not None, node.total_requests)
+
+    def _acquire(self, exclude: List[OllamaNode], sticky_key: Optional[str]) -> OllamaNode:
+        with self._lock:
+            candidates = [n for n in self.nodes if n not in exclude and n.healthy] or \
+                         [n for n in self.nodes if n not in exclude] or self.nodes
+            node = None
+            if sticky_key is not None:
+                pinned = self._sticky.get(sticky_key)
+                if pinned is not None and pinned in candidates:
+                    node = pinned
+                    self._sticky.move_to_end(sticky_key)
+            if node is None:
+                node = min(candidates, key=self._score)
+                if sticky_key is not None:
+                    self._sticky[sticky_key] = node
+                    self._sticky.move_to_end(sticky_key)
+                    while len(self._sticky) > self.max_sticky_keys:
+                        self._sticky.popitem(last=False)
+            node.outstanding += 1
+            node.total_requests += 1
+            return node
+
+    def _release(self, node: OllamaNode, response: Any = None, error: Optional[Exception] = None) -> None:
+        with self._lock:
+            node.outstanding -= 1
+            if error is not None:
+                node.total_failures += 1
+                node.last_error = f"{type(error).__name__}: {error}"
+                return
+            eval_count = response.get("eval_count") if response is not None else None
+            eval_duration = response.get("eval_duration") if response is not None else None
+            if eval_count and eval_duration:
+                tps = eval_count / (eval_duration / 1e9)
+                previous = node.tokens_per_second
+                node.tokens_per_second = tps if previous is None else \
+                    self.ewma_alpha * tps + (1 - self.ewma_alpha) * previous
+
+    def forget_sticky(self, sticky_key: str) -> None:
+        with self._lock:
+            self._sticky.pop(sticky_key, None)
+
+    def chat(self, *, sticky_key: Optional[str] = None, retries: int = 0, **chat_kwargs: Any) -> Any:
+        """Blocking chat call on the best node; on failure retries up to `retries` times on other nodes."""
+        tried: List[OllamaNode] = []
+        while True:
+            node = self._acquire(tried, sticky_key)
+            try:
+                response = node.client.chat(**chat_kwargs)
+            except Exception as e:
+                self._release(node, error=e)
+                tried.append(node)
+                if len(tried) > retries or len(tried) >= len(self.nodes):
+                    raise
+                print(f"WARNING: Ollama node {node.host} failed ({e}); retrying on another node.")
+                continue
+            self._release(node, response=response)
+            return response
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {
+                    "host": node.host,
+                    "healthy": node.healthy,
+                    "outstanding": node.outstanding,
+                    "tokens_per_second": round(node.tokens_per_second, 1) if node.tokens_per_second else None,
+                    "total_requests": node.total_requests,
+                    "total_failures": node.total_failures,
+                    "last_error": node.last_error,
+                }
+                for node in self.nodes
+            ]
@@ -2,22 +2,45 @@ import asyncio
 import json
 import os
 import re
+import time
 import yaml
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Literal, Optional, Tuple
 
-import ollama
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 from pydantic import ValidationError
 from datetime import datetime, timedelta
-from models import ProcessedRelocationTask, QuizFormData, ServiceRecommendation
+from chat_sessions import ChatSessionStore
+from llm_budget import PersonalizationBudget, personalization_rank_key
+from llm_guard import CircuitBreaker, CircuitOpenError, guarded_llm_call
+from llm_pool import OllamaPool
+from model_router import ModelRouter, WorkloadProfile
+from profiling import Profiler, ProfilingMiddleware, profile_span
+from response_cache import CoalescingCache
+from checklist_store import ChecklistStore
+from gazetteer import CanonicalDestination, Gazetteer
+from retrieval import RetrievalIndex
+from models import (
+    BulkUpdateResponse,
+    BulkUpdateTaskStatePayload,
+    ChatPayload,
+    ChatResponse,
+    ChecklistApiResponse,
+    CustomTaskPayload,
+    FirestoreRelocationTask,
+    ProcessedRelocationTask,
+    QuizFormData,
+    ServiceRecommendation,
+    UpdateTaskStatePayload,
+)
 
 load_dotenv()
 
 # --- Configuration ---
 LLM_MODEL_NAME = os.getenv("LLM_MODEL_NAME", "qwen3:1.7b")
+LLM_FALLBACK_MODEL_NAME = os.getenv("LLM_FALLBACK_MODEL_NAME", "") # Used when a workload is downgraded; unset = never downgrade
 BACKEND_PORT = int(os.getenv("BACKEND_PORT", 8000))
 FRONTEND_ORIGINS = os.getenv("FRONTEND_ORIGINS", "http://localhost:8100").split(',')
 
@@ -29,6 +52,45 @@ SERVICES_DATA_PATH = os.path.join(CHECKLISTS_DIR, 'services.yaml')
 PREDEPART_DATA_PATH = os.path.join(CHECKLISTS_DIR, 'predepart.yaml')
 DEPART_DATA_PATH = os.path.join(CHECKLISTS_DIR, 'depart.yaml')
 ARRIVE_DATA_PATH = os.path.join(CHECKLISTS_DIR, 'arrive.yaml')
+GAZETTEER_DATA_PATH = os.path.join(CHECKLISTS_DIR, 'gazetteer.yaml')
+PERSONALIZATION_CACHE_SIZE = int(os.getenv("PERSONALIZATION_CACHE_SIZE", 16384))
+
+CHAT_CONTEXT_TOP_K = int(os.getenv("CHAT_CONTEXT_TOP_K", 4))
+CHAT_SESSION_MAX = int(os.getenv("CHAT_SESSION_MAX", 500))
+CHAT_SESSION_TTL_SECONDS = int(os.getenv("CHAT_SESSION_TTL_SECONDS", 1800))
+CHAT_SESSION_MAX_MESSAGES = int(os.getenv("CHAT_SESSION_MAX_MESSAGES", 40))
+# ~4 chars per token: keep history well inside Ollama's default 2048-token context with room for the reply
+CHAT_SESSION_MAX_HISTORY_CHARS = int(os.getenv("CHAT_SESSION_MAX_HISTORY_CHARS", 6000))
+# Deadlines and circuit breaker for LLM calls
+LLM_PERSONALIZE_CONCURRENCY = int(os.getenv("LLM_PERSONALIZE_CONCURRENCY", 2)) # Parallel calls in progressive mode
+# Default per-request personalization budget (0 = unlimited); overridable per request via query params
+LLM_BUDGET_SECONDS = float(os.getenv("LLM_BUDGET_SECONDS", 0))
+LLM_BUDGET_CALLS = int(os.getenv("LLM_BUDGET_CALLS", 0))
+LLM_PERSONALIZE_TIMEOUT_SECONDS = float(os.getenv("LLM_PERSONALIZE_TIMEOUT_SECONDS", 10))
+LLM_PERSONALIZE_SLOW_SECONDS = float(os.getenv("LLM_PERSONALIZE_SLOW_SECONDS", 6))
+LLM_CHAT_TIMEOUT_SECONDS = float(os.getenv("LLM_CHAT_TIMEOUT_SECONDS", 60))
+LLM_CHAT_SLOW_SECONDS = float(os.getenv("LLM_CHAT_SLOW_SECONDS", 40))
+LLM_BREAKER_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", 3))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", 30))
+# Per-workload model routing
+LLM_PERSONALIZE_MODEL = os.getenv("LLM_PERSONALIZE_MODEL", LLM_MODEL_NAME)
+LLM_CHAT_MODEL = os.getenv("LLM_CHAT_MODEL", LLM_MODEL_NAME)
+LLM_CHAT_THINK = os.getenv("LLM_CHAT_THINK", "false").lower() == "true" # /chat strips <think> from replies
+LLM_NO_THINK_DIRECTIVE = os.getenv("LLM_NO_THINK_DIRECTIVE", "/no_think") # qwen3 soft switch to skip <think>
+LLM_DOWNGRADE_MAX_IN_FLIGHT = int(os.getenv("LLM_DOWNGRADE_MAX_IN_FLIGHT", 4))
+LLM_DOWNGRADE_COOLDOWN_SECONDS = float(os.getenv("LLM_DOWNGRADE_COOLDOWN_SECONDS", 30))
+# Ollama backends (comma-separated); defaults to OLLAMA_HOST or the local instance
+OLLAMA_HOSTS = [h.strip() for h in os.getenv("OLLAMA_HOSTS", os.getenv("OLLAMA_HOST", "http://127.0.0.1:11434")).split(',') if h.strip()]
+OLLAMA_HEALTH_INTERVAL_SECONDS = float(os.getenv("OLLAMA_HEALTH_INTERVAL_SECONDS", 10))
+LLM_PERSONALIZE_RETRIES = int(os.getenv("LLM_PERSONALIZE_RETRIES", 1)) # Retries on another node (idempotent)
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m") # Keep the model (and its KV cache) resident between turns
+# Opt-in request profiling: send 'X-Profile: 1' with 'X-Profile-Token: <PROFILING_TOKEN>',
+# or set PROFILE_SAMPLE_RATE (0.0-1.0) to profile a random fraction of requests
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN") # Header-triggered profiling and /profiles are disabled if unset
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0.0))
+PROFILES_DIR = os.getenv("PROFILES_DIR", os.path.join(BASE_DIR, 'profiles'))
+
+CHECKLIST_DB_PATH = os.getenv("CHECKLIST_DB_PATH", os.path.join(BASE_DIR, 'checklists.db'))
 
 # --- FastAPI App Setup ---
 app = FastAPI(title="Smooth Migration LLM Backend")
@@ -38,11 +100,53 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Profile-Id"],
+)
+profiler = Profiler(PROFILES_DIR, token=PROFILING_TOKEN, sample_rate=PROFILE_SAMPLE_RATE)
+app.add_middleware(ProfilingMiddleware, profiler=profiler, paths=("/generate_tasks", "/chat"))
+
+# --- LLM Client ---
+# The HTTP timeout is a backstop so worker threads abandoned by a deadline don't linger forever
+llm_pool = OllamaPool(
+    OLLAMA_HOSTS,
+    timeout=max(LLM_PERSONALIZE_TIMEOUT_SECONDS, LLM_CHAT_TIMEOUT_SECONDS) + 5,
+    health_interval=OLLAMA_HEALTH_INTERVAL_SECONDS,
+)
+llm_pool.start_health_checks()
+llm_breaker = CircuitBreaker(
+    "ollama",
+    failure_threshold=LLM_BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=LLM_BREAKER_RESET_SECONDS,
+)
+
+model_router = ModelRouter(
+    {
+        # Both workloads strip <think> text from the reply and throw it away, so thinking is off by default
+        "personalization": WorkloadProfile(
+            model=LLM_PERSONALIZE_MODEL,
+            fallback_model=LLM_FALLBACK_MODEL_NAME or LLM_PERSONALIZE_MODEL,
+            options={'temperature': 0.6, 'num_predict': 256},
+            think=False,
+            downgrade_latency_seconds=LLM_PERSONALIZE_SLOW_SECONDS * 0.5,
+        ),
+        "chat": WorkloadProfile(
+            model=LLM_CHAT_MODEL,
+            fallback_model=LLM_FALLBACK_MODEL_NAME or LLM_CHAT_MODEL,
+            options={'temperature': 0.7},
+            think=LLM_CHAT_THINK,
+            downgrade_latency_seconds=LLM_CHAT_SLOW_SECONDS * 0.5,
+        ),
+    },
+    no_think_directive=LLM_NO_THINK_DIRECTIVE,
+    max_in_flight=LLM_DOWNGRADE_MAX_IN_FLIGHT,
+    cooldown_seconds=LLM_DOWNGRADE_COOLDOWN_SECONDS,
 )
 
 # --- Global Data Stores ---
 services_data_list: List[Dict[str, Any]] = []
 all_task_templates: List[Dict[str, Any]] = []
+retrieval_index = RetrievalIndex()
+gazetteer = Gazetteer([])
 
 # --- Data Loading Functions ---
 def load_yaml_file(file_path: str, data_type_name: str) -> List[Dict[str, Any]]:
@@ -74,7 +178,7 @@ def load_yaml_file(file_path: str, data_type_name: str) -> List[Dict[str, Any]]:
 
 def initialize_global_data():
     """Loads all necessary YAML data into global variables."""
-    global services_data_list, all_task_templates
+    global services_data_list, all_task_templates, retrieval_index, gazetteer
     print("Initializing global data...")
 
     services_data_list = load_yaml_file(SERVICES_DATA_PATH, "services")
@@ -95,9 +199,29 @@ def initialize_global_data():
     if not services_data_list:
         print("WARNING: No services data loaded. Service recommendations will be empty.")
 
+    retrieval_index = RetrievalIndex()
+    retrieval_index.build(all_task_templates, services_data_list)
+
+    gazetteer = Gazetteer(load_yaml_file(GAZETTEER_DATA_PATH, "gazetteer countries"))
+    print(f"Built gazetteer index: {len(gazetteer.exact)} destination names.")
+
 # Call data loading on startup
 initialize_global_data()
 
+# Personalized explanations keyed on the canonical destination, shared across requests
+personalization_cache = CoalescingCache(max_size=PERSONALIZATION_CACHE_SIZE)
+
+# Per-user checklist persistence (SQLite, WAL mode)
+checklist_store = ChecklistStore(CHECKLIST_DB_PATH)
+
+# Server-held chat histories
+chat_sessions = ChatSessionStore(
+    max_sessions=CHAT_SESSION_MAX,
+    ttl_seconds=CHAT_SESSION_TTL_SECONDS,
+    max_messages=CHAT_SESSION_MAX_MESSAGES,
+    max_history_chars=CHAT_SESSION_MAX_HISTORY_CHARS,
+)
+
 
 # --- Helper Functions for Task Processing ---
 def get_nested_value(data_dict: Dict[str, Any], path_str: str, default: Any = None) -> Any:
@@ -166,19 +290,48 @@ def check_task_applicability(task_template: Dict[str, Any], quiz_data_dict: Dict
             
     return True # All condition sets were met
 
-async def personalize_explanation_with_llm(base_explanation: str, task_desc: str, quiz_data: QuizFormData) -> str:
-    """Uses LLM to personalize a base explanation. Fallback to base_explanation with simple replacement."""
-    explanation = base_explanation.replace("[Destination Country]", quiz_data.destination or "your destination")
-    explanation = explanation.replace("[Destination City/Region]", quiz_data.destination or "your new city/Region")
-
+def destination_placeholders(destination: Optional[str]) -> Tuple[Optional[CanonicalDestination], str, str]:
+    """Resolves the free-text destination once. Returns (canonical, country text, city/region text).
+    Destinations the gazetteer doesn't list are kept as typed."""
+    canonical = gazetteer.canonicalize(destination)
+    if canonical is None:
+        raw = (destination or "").strip()
+        return None, raw or "your destination", raw or "your new city/region"
+    return canonical, canonical.country_name, canonical.region_name or canonical.country_name
+
+def move_month(move_date: str) -> str:
+    """Move date at month granularity ("2026-12-14T09:00" -> "December 2026") for the personalization prompt."""
+    try:
+        return datetime.fromisoformat(move_date.strip()[:10]).strftime("%B %Y")
+    except ValueError:
+        return move_date.strip() or "not specified"
+
+def apply_destination_placeholders(text: str, quiz_data: QuizFormData) -> str:
+    return fill_destination_placeholders(text, quiz_data.destination)
+
+def fill_destination_placeholders(text: str, destination: Optional[str]) -> str:
+    _, country_text, region_text = destination_placeholders(destination)
+    text = text.replace("[Destination Country]", country_text)
+    return text.replace("[Destination City/Region]", region_text)
+
+async def personalize_explanation_with_llm(base_explanation: str, task_desc: str, quiz_data: QuizFormData,
+                                           budget: Optional[PersonalizationBudget] = None,
+                                           task_id: Optional[str] = None) -> Tuple[str, Optional[str]]:
+    """Uses LLM to personalize a base explanation. Fallback to base_explanation with simple replacement.
+    Returns (explanation, model that served it or None if the base explanation was used).
+    With a budget, only an actual LLM call is charged to it; cached and coalesced results are free."""
+    explanation = apply_destination_placeholders(base_explanation, quiz_data)
 
     if not task_desc: # Safety check
-        return explanation
+        return explanation, None
+
+    _, country_text, region_text = destination_placeholders(quiz_data.destination)
+    destination_text = country_text if region_text == country_text else f"{region_text}, {country_text}"
 
     quiz_summary_parts = [
         f"Moving type: {quiz_data.moveType}",
-        f"Destination: {quiz_data.destination}",
-        f"Move date: {quiz_data.moveDate}",
+        f"Destination: {destination_text}",
+        f"Move date: {move_month(quiz_data.moveDate)}", # Month only, so similar users share prompts (and cache entries)
     ]
     if quiz_data.family.get("children"): quiz_summary_parts.append("Moving with children")
     if quiz_data.family.get("pets"): quiz_summary_parts.append("Moving with pets")
@@ -202,14 +355,54 @@ async def personalize_explanation_with_llm(base_explanation: str, task_desc: str
     Output ONLY the personalized explanation text. Do not include preambles like "Here's the personalized explanation:".
     Be concise.
     """
+    # The key is exactly what the prompt is built from. The prompt holds the canonical destination and
+    # the move month, so "Germany", "germany " and "DE" moving the same month with the same household
+    # share one cache entry (and one in-flight LLM call)
+    cache_key = (task_desc, explanation, user_context)
+
+    async def compute() -> Tuple[str, Optional[str]]:
+        if budget is not None:
+            if llm_breaker.is_open:
+                budget.skip(task_id)
+                return explanation, None
+            # Decided when the call would actually start, so the time budget reflects real progress
+            if not budget.try_acquire(task_id):
+                return explanation, None
+        call_started = time.monotonic()
+        try:
+            return await call_personalization_llm(prompt, task_desc, explanation)
+        finally:
+            if budget is not None:
+                budget.record_call(time.monotonic() - call_started)
+
+    result = await personalization_cache.get_or_compute(
+        cache_key,
+        compute,
+        cacheable=lambda result: result[1] is not None, # Don't cache fallbacks
+    )
+    if budget is not None:
+        budget.settle(task_id) # Served from cache or a shared in-flight call: decided, nothing spent
+    return result
+
+async def call_personalization_llm(prompt: str, task_desc: str, explanation: str) -> Tuple[str, Optional[str]]:
+    """Runs the personalization prompt through the LLM, stripping <think> blocks and preambles."""
+    if llm_breaker.is_open: # Degraded mode: skip the LLM entirely while the breaker is open
+        return explanation, None
+
     try:
         # print(f"DEBUG: Sending to LLM for task '{task_desc}'. Prompt (simplified): {prompt[:200]}...")
-        response = await asyncio.to_thread(
-            ollama.chat,
-            model=LLM_MODEL_NAME,
-            messages=[{'role': 'user', 'content': prompt}],
-            options={'temperature': 0.6}
-        )
+        with model_router.route("personalization") as route, profile_span("ollama.chat (personalization)"):
+            response = await guarded_llm_call(
+                llm_breaker,
+                llm_pool.chat,
+                timeout=LLM_PERSONALIZE_TIMEOUT_SECONDS,
+                slow_after=LLM_PERSONALIZE_SLOW_SECONDS,
+                model=route.model,
+                messages=model_router.apply_think_setting(route, [{'role': 'user', 'content': prompt}]),
+                options=route.options,
+                retries=LLM_PERSONALIZE_RETRIES,
+                report_outcome=not route.downgraded, # A broken fallback model says nothing about the primary
+            )
         raw_personalized_text = response['message']['content'].strip()
         
         # --- AGGRESSIVE STRIPPING FOR <think> and PREAMBLES ---
@@ -261,10 +454,17 @@ async def personalize_explanation_with_llm(base_explanation: str, task_desc: str
         # print(f"DEBUG: LLM raw explanation for '{task_desc}': {raw_personalized_text}")
         #print(f"DEBUG: LLM text after <think> strip for '{task_desc}': {text_after_think_strip}")
         #print(f"DEBUG: LLM final personalized explanation for '{task_desc}': {final_personalized_text}")
-        return final_personalized_text if final_personalized_text else explanation
+        if not final_personalized_text:
+            return explanation, None
+        return final_personalized_text, route.model
+    except CircuitOpenError:
+        return explanation, None
+    except asyncio.TimeoutError:
+        print(f"ERROR personalizing explanation with LLM for task '{task_desc}': deadline of {LLM_PERSONALIZE_TIMEOUT_SECONDS}s exceeded. Falling back.")
+        return explanation, None
     except Exception as e:
         print(f"ERROR personalizing explanation with LLM for task '{task_desc}': {e}. Falling back.")
-        return explanation
+        return explanation, None
 
 def find_matching_services(task_template: Dict[str, Any]) -> List[ServiceRecommendation]:
     """Finds matching services based on direct IDs or keywords from task_template."""
@@ -366,22 +566,27 @@ def calculate_absolute_due_date(yaml_due_date_str: str, move_date_iso: str) -> s
      return yaml_due_date_str.strip() if yaml_due_date_str else ""
 
 
-async def process_single_task_template(task_template: Dict[str, Any], quiz_data: QuizFormData) -> Optional[ProcessedRelocationTask]:
-    """Processes a single task template to generate a ProcessedRelocationTask."""
+async def process_single_task_template(task_template: Dict[str, Any], quiz_data: QuizFormData, personalize: bool = True,
+                                       budget: Optional[PersonalizationBudget] = None) -> Optional[ProcessedRelocationTask]:
+    """Processes a single task template to generate a ProcessedRelocationTask.
+    With personalize=False the base explanation is always used (no LLM call); LLM calls are charged to budget."""
     task_id = task_template.get("task_id", f"unknown_task_{os.urandom(4).hex()}")
     task_desc = task_template.get("task_description", "Task description not provided.")
     
     # Get base explanation
     final_explanation = task_template.get("base_importance_explanation", "This task is important for your relocation.")
-    final_explanation = final_explanation.replace("[Destination Country]", quiz_data.destination or "your destination")
-    final_explanation = final_explanation.replace("[Destination City/Region]", quiz_data.destination or "your new city/region")
+    final_explanation = apply_destination_placeholders(final_explanation, quiz_data)
     
     # Personalize if flagged in YAML
-    if task_template.get("personalize_explanation", False):
-        final_explanation = await personalize_explanation_with_llm(final_explanation, task_desc, quiz_data)
+    llm_model = None
+    if personalize and task_template.get("personalize_explanation", False):
+        final_explanation, llm_model = await personalize_explanation_with_llm(
+            final_explanation, task_desc, quiz_data, budget=budget, task_id=task_template.get("task_id")
+        )
 
     # Get recommended services
-    recommended_services = find_matching_services(task_template)
+    with profile_span("find_matching_services"):
+        recommended_services = find_matching_services(task_template)
 
 
     original_yaml_due_date = task_template.get("due_date", "As soon as possible")
@@ -396,15 +601,27 @@ async def process_single_task_template(task_template: Dict[str, Any], quiz_data:
             importance_explanation=final_explanation,
             recommended_services=recommended_services,
             stage=task_template.get("stage", "unknown"), # Should be set during loading
-            category=task_template.get("category", "General")
+            category=task_template.get("category", "General"),
+            llm_model=llm_model
         )
     except ValidationError as e:
         print(f"ERROR validating ProcessedRelocationTask for '{task_desc}' (ID: {task_id}): {e}")
         return None
 
+def ndjson_line(event: Dict[str, Any]) -> str:
+    """Serializes one stream event as a newline-delimited JSON line."""
+    with profile_span("serialize"):
+        return json.dumps(event) + "\n"
+
 # --- API Endpoints ---
 @app.post("/generate_tasks", response_model=None) # response_model=None for StreamingResponse
-async def stream_relocation_tasks(quiz_data: QuizFormData):
+async def stream_relocation_tasks(
+    quiz_data: QuizFormData,
+    user_id: Optional[str] = Query(None),
+    stream_mode: Literal["sequential", "progressive"] = Query("sequential"),
+    llm_budget_seconds: Optional[float] = Query(None, ge=0),
+    llm_budget_calls: Optional[int] = Query(None, ge=0),
+):
     print(f"Received /generate_tasks request. Quiz data: {quiz_data.model_dump(exclude_none=True)}")
     if not all_task_templates:
         print("CRITICAL ERROR: No task templates available. Check YAML loading.")
@@ -413,9 +630,10 @@ async def stream_relocation_tasks(quiz_data: QuizFormData):
     quiz_data_dict = quiz_data.model_dump()
     
     applicable_task_templates: List[Dict[str, Any]] = []
-    for tt in all_task_templates:
-        if check_task_applicability(tt, quiz_data_dict):
-            applicable_task_templates.append(tt)
+    with profile_span("check_task_applicability"):
+        for tt in all_task_templates:
+            if check_task_applicability(tt, quiz_data_dict):
+                applicable_task_templates.append(tt)
     
     print(f"Filtered to {len(applicable_task_templates)} applicable task templates.")
 
@@ -453,59 +671,335 @@ async def stream_relocation_tasks(quiz_data: QuizFormData):
         # maybe we should add due_date sorting if due_date format is consistent and parsable
     ))
 
+    # Personalization budget is spent on the most valuable tasks first
+    personalization_candidates = sorted(
+        (tt for tt in applicable_task_templates if tt.get("personalize_explanation", False) and tt.get("task_id")),
+        key=personalization_rank_key,
+    )
+    budget = PersonalizationBudget(
+        [tt["task_id"] for tt in personalization_candidates],
+        max_seconds=llm_budget_seconds if llm_budget_seconds is not None else LLM_BUDGET_SECONDS,
+        max_calls=llm_budget_calls if llm_budget_calls is not None else LLM_BUDGET_CALLS,
+    )
+
+    def to_task_event(processed_task: ProcessedRelocationTask) -> Dict[str, Any]:
+        with profile_span("serialize"):
+            task_to_send = processed_task.model_dump()
+        task_to_send["event_type"] = "task_item" # Add event type
+        # These are UI specific, added before sending if not in ProcessedRelocationTask model
+        task_to_send.setdefault("isExpanded", False) 
+        task_to_send.setdefault("completed", False)
+        return task_to_send
+
+    async def persist_tasks(tasks_to_persist: List[Dict[str, Any]]):
+        if not (user_id and tasks_to_persist):
+            return
+        # Persist the whole checklist in one batched write transaction
+        try:
+            saved = await asyncio.to_thread(checklist_store.save_generated_tasks, user_id, tasks_to_persist)
+            print(f"Persisted {saved} tasks for user '{user_id}'.")
+        except Exception as e:
+            print(f"ERROR persisting checklist for user '{user_id}': {e}")
+
+    def stream_end_event(processed_task_count: int, personalized_count: int) -> str:
+        return json.dumps({
+            "event_type": "stream_end",
+            "total_streamed": processed_task_count,
+            "total_personalized": personalized_count,
+            "llm_degraded": llm_breaker.is_open, # True if base explanations were used because the LLM is unhealthy
+            "llm_budget": budget.report(),
+        }) + "\n"
+
     async def task_stream_generator():
         yield json.dumps(initial_stream_message) + "\n"
         print(f"Streamed initial structure: {initial_stream_message}")
 
         processed_task_count = 0
+        personalized_count = 0
+        tasks_to_send: List[Dict[str, Any]] = []
         for task_template in applicable_task_templates:
-            processed_task = await process_single_task_template(task_template, quiz_data)
+            personalize = bool(task_template.get("personalize_explanation", False)) and bool(task_template.get("task_id"))
+            with profile_span("process_single_task_template"):
+                processed_task = await process_single_task_template(task_template, quiz_data, personalize=personalize, budget=budget)
             if processed_task:
-                task_to_send = processed_task.model_dump()
-                task_to_send["event_type"] = "task_item" # Add event type
-                # These are UI specific, added before sending if not in ProcessedRelocationTask model
-                task_to_send.setdefault("isExpanded", False) 
-                task_to_send.setdefault("completed", False)
-                yield json.dumps(task_to_send) + "\n"
+                task_to_send = to_task_event(processed_task)
+                yield ndjson_line(task_to_send)
                 processed_task_count += 1
+                personalized_count += 1 if processed_task.llm_model else 0
+                tasks_to_send.append(task_to_send)
             await asyncio.sleep(0.01) # Small delay to allow other I/O, can be tuned
         
         print(f"Finished streaming {processed_task_count} tasks.")
+        await persist_tasks(tasks_to_send)
         # Optionally, send a "stream_end" event
-        yield json.dumps({"event_type": "stream_end", "total_streamed": processed_task_count}) + "\n"
+        yield stream_end_event(processed_task_count, personalized_count)
 
+    async def progressive_task_stream_generator():
+        """Phase 1 streams every task with its base explanation (no LLM calls);
+        phase 2 streams a task_update for each personalized explanation as its LLM call completes."""
+        yield json.dumps(initial_stream_message) + "\n"
+        print(f"Streamed initial structure: {initial_stream_message}")
+
+        tasks_to_send: List[Dict[str, Any]] = []
+        to_personalize: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+        for task_template in applicable_task_templates:
+            processed_task = await process_single_task_template(task_template, quiz_data, personalize=False)
+            if processed_task:
+                task_to_send = to_task_event(processed_task)
+                needs_llm = bool(task_template.get("personalize_explanation", False)) and bool(task_template.get("task_id"))
+                task_to_send["personalization_pending"] = needs_llm
+                yield ndjson_line(task_to_send)
+                tasks_to_send.append(task_to_send)
+                if needs_llm:
+                    to_personalize.append((task_template, task_to_send))
+        print(f"Streamed {len(tasks_to_send)} base tasks; personalizing {len(to_personalize)}.")
+
+        semaphore = asyncio.Semaphore(LLM_PERSONALIZE_CONCURRENCY)
+
+        async def personalize_task(task_template: Dict[str, Any], task_to_send: Dict[str, Any]):
+            async with semaphore:
+                result = await personalize_explanation_with_llm(
+                    task_to_send["importance_explanation"], task_to_send["task_description"], quiz_data,
+                    budget=budget, task_id=task_template["task_id"],
+                )
+            return task_to_send, result
+
+        # Tasks queue on the semaphore in creation order, so create them highest value first
+        to_personalize.sort(key=lambda pair: personalization_rank_key(pair[0]))
+        personalized_count = 0
+        pending = [asyncio.create_task(personalize_task(tt, t)) for tt, t in to_personalize]
+        try:
+            for next_done in asyncio.as_completed(pending):
+                task_to_send, (explanation, llm_model) = await next_done
+                task_to_send["personalization_pending"] = False
+                if llm_model:
+                    task_to_send["importance_explanation"] = explanation
+                    task_to_send["llm_model"] = llm_model
+                    personalized_count += 1
+                # Fallbacks (budget skip, breaker open, LLM error) are sent too, so the client clears its
+                # pending indicator; they carry the base explanation already streamed and llm_model null
+                yield json.dumps({
+                    "event_type": "task_update",
+                    "task_id": task_to_send["task_id"],
+                    "stage": task_to_send["stage"],
+                    "importance_explanation": task_to_send["importance_explanation"],
+                    "llm_model": task_to_send.get("llm_model"),
+                    "personalization_pending": False,
+                }) + "\n"
+        finally:
+            for task in pending: # Client went away: don't keep the LLM busy
+                task.cancel()
+
+        print(f"Finished progressive stream: {len(tasks_to_send)} tasks, {personalized_count} personalized.")
+        await persist_tasks(tasks_to_send)
+        yield stream_end_event(len(tasks_to_send), personalized_count)
+
+    if stream_mode == "progressive":
+        return StreamingResponse(progressive_task_stream_generator(), media_type="application/x-ndjson")
     return StreamingResponse(task_stream_generator(), media_type="application/x-ndjson")
 
-@app.post("/chat")
-async def chat_with_llm(payload: Dict[str, Any]):
-    message = payload.get("message")
-    history = payload.get("history", []) # Expecting list of {'role': '...', 'content': '...'}
+@app.get("/checklist", response_model=ChecklistApiResponse)
+async def get_checklist(user_id: str = Query(...)):
+    checklist = await asyncio.to_thread(checklist_store.get_checklist, user_id)
+    return ChecklistApiResponse(**checklist)
+
+@app.patch("/checklist", response_model=BulkUpdateResponse)
+async def bulk_update_task_states(payload: BulkUpdateTaskStatePayload, user_id: str = Query(...)):
+    updates = [
+        (update.task_id, update.model_dump(exclude={"task_id"}, exclude_none=True))
+        for update in payload.updates
+    ]
+    updated, missing = await asyncio.to_thread(checklist_store.bulk_update_tasks, user_id, updates)
+    print(f"Bulk update for user '{user_id}': {len(updated)} updated, {len(missing)} missing.")
+    return BulkUpdateResponse(updated=updated, missing=missing)
+
+@app.patch("/checklist/tasks/{task_id}", response_model=FirestoreRelocationTask)
+async def update_task_state(task_id: str, payload: UpdateTaskStatePayload, user_id: str = Query(...)):
+    changes = payload.model_dump(exclude_none=True)
+    found = await asyncio.to_thread(checklist_store.update_task, user_id, task_id, changes)
+    if not found:
+        raise HTTPException(status_code=404, detail=f"Task '{task_id}' not found.")
+    return await asyncio.to_thread(checklist_store.get_task, user_id, task_id)
+
+@app.post("/checklist/tasks", response_model=FirestoreRelocationTask, status_code=201)
+async def create_custom_task(payload: CustomTaskPayload, user_id: str = Query(...)):
+    task = FirestoreRelocationTask(
+        task_id=f"custom_{int(datetime.now().timestamp() * 1000)}_{os.urandom(2).hex()}",
+        task_description=payload.task_description,
+        priority=payload.priority,
+        due_date=payload.due_date,
+        stage=payload.stage,
+        category=payload.category,
+        is_custom=True,
+    )
+    return await asyncio.to_thread(checklist_store.add_custom_task, user_id, task)
+
+CHAT_SYSTEM_PROMPT = (
+    "You are a relocation assistant for Smooth Migration. Answer questions about the user's move concisely. "
+    "Messages may start with a 'Relevant checklist items' block; use those items when they are relevant "
+    "to the question and ignore them otherwise."
+)
+
+async def build_chat_context(message: str, user_id: Optional[str], task_ids: Optional[List[str]],
+                             destination: Optional[str] = None) -> Tuple[str, List[str]]:
+    """Retrieves the few task/service snippets most relevant to the message as a bounded context block.
+    Destination placeholders in the snippets are filled from destination (neutral wording if unknown)."""
+    allowed_task_ids: Optional[set] = set(task_ids) if task_ids else None
+    if user_id and allowed_task_ids is None:
+        checklist = await asyncio.to_thread(checklist_store.get_checklist, user_id)
+        stored_ids = {task.task_id for stage_tasks in checklist.values() for task in stage_tasks}
+        allowed_task_ids = stored_ids or None # Unknown user: fall back to all templates
+
+    with profile_span("retrieval_index.search"):
+        hits = retrieval_index.search(message, top_k=CHAT_CONTEXT_TOP_K, allowed_task_ids=allowed_task_ids)
+    if not hits:
+        return "", []
+
+    context_lines = "\n".join(f"- {fill_destination_placeholders(hit['snippet'], destination)}" for hit in hits)
+    return f"Relevant checklist items:\n{context_lines}", [hit["id"] for hit in hits]
+
+def ollama_timings(response: Any) -> Dict[str, Any]:
+    """Extracts prefill/generation timings (ns -> ms) from an Ollama chat response."""
+    def to_ms(value: Optional[int]) -> Optional[float]:
+        return round(value / 1e6, 2) if value is not None else None
+    return {
+        "prompt_eval_count": response.get("prompt_eval_count"),
+        "prompt_eval_ms": to_ms(response.get("prompt_eval_duration")),
+        "eval_count": response.get("eval_count"),
+        "eval_ms": to_ms(response.get("eval_duration")),
+        "total_ms": to_ms(response.get("total_duration")),
+    }
+
+@app.post("/chat/sessions", status_code=201)
+async def create_chat_session(payload: Optional[Dict[str, Any]] = None):
+    user_id = (payload or {}).get("user_id")
+    session = chat_sessions.create(CHAT_SYSTEM_PROMPT, user_id=user_id)
+    print(f"Created chat session {session.session_id} (user: {user_id}). Active sessions: {len(chat_sessions)}.")
+    return {"session_id": session.session_id, "ttl_seconds": CHAT_SESSION_TTL_SECONDS}
+
+@app.delete("/chat/sessions/{session_id}", status_code=204)
+async def delete_chat_session(session_id: str):
+    llm_pool.forget_sticky(session_id)
+    if not chat_sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail="Chat session not found or expired.")
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat_with_llm(payload: ChatPayload):
+    message = payload.message
+    history = payload.history
+    session_id = payload.session_id
+    user_id = payload.user_id
+    task_ids = payload.task_ids
     if not message:
         raise HTTPException(status_code=400, detail="Message not provided")
 
-    print(f"Received chat: '{message}'. History length: {len(history)}.")
-    
-    messages_for_llm = history + [{'role': 'user', 'content': message}]
-    
+    session = None
+    if session_id:
+        session = chat_sessions.get(session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Chat session not found or expired.")
+        user_id = user_id or session.user_id
+
+    print(f"Received chat: '{message}'. Session: {session_id}. History length: {len(session.messages) if session else len(history)}.")
+
+    context_block, context_ids = "", []
+    if user_id or task_ids:
+        context_block, context_ids = await build_chat_context(message, user_id, task_ids, payload.destination)
+        if context_ids:
+            print(f"Injected {len(context_ids)} retrieved snippets into chat prompt: {context_ids}")
+
+    if session:
+        # Context goes into the current user turn only (not the system prompt, not the stored history):
+        # the pinned prefix and earlier turns never change, and the history doesn't grow by a context
+        # block per turn. Only the latest turn is re-prefilled on the next request.
+        user_turn = f"{context_block}\n\n{message}" if context_block else message
+        messages_for_llm = session.prompt_messages() + [{'role': 'user', 'content': user_turn}]
+    else:
+        messages_for_llm = history + [{'role': 'user', 'content': message}]
+        if context_block:
+            messages_for_llm = [{'role': 'system', 'content': context_block}] + messages_for_llm
+
     try:
-        response = await asyncio.to_thread(
-            ollama.chat,
-            model=LLM_MODEL_NAME,
-            messages=messages_for_llm,
-            options={'temperature': 0.7} # Adjust as needed
-        )
-        response_text = re.sub(r'<think>(?s:.)*?</think>\n\n', '', response['message']['content'])
+        with model_router.route("chat") as route, profile_span("ollama.chat (chat)"):
+            messages_for_llm = model_router.apply_think_setting(route, messages_for_llm)
+            response = await guarded_llm_call(
+                llm_breaker,
+                llm_pool.chat,
+                timeout=LLM_CHAT_TIMEOUT_SECONDS,
+                slow_after=LLM_CHAT_SLOW_SECONDS,
+                model=route.model,
+                messages=messages_for_llm,
+                options=route.options,
+                keep_alive=OLLAMA_KEEP_ALIVE,
+                report_outcome=not route.downgraded,
+                sticky_key=session.session_id if session else None # Same node every turn keeps its KV cache warm
+            )
+        raw_response_text = response['message']['content']
+        response_text = re.sub(r'<think>(?s:.)*?</think>\n\n', '', raw_response_text)
         # response_text = response['message']['content']
         print(f"LLM chat response: {response_text[:100]}...")
-        return {"response": response_text}
+        if session:
+            # Store the bare user message and the raw assistant text (what the model produced)
+            chat_sessions.append_turn(session, message, raw_response_text)
+        return ChatResponse(
+            response=response_text,
+            context_ids=context_ids,
+            session_id=session.session_id if session else None,
+            model=route.model,
+            model_downgraded=route.downgraded,
+            timings=ollama_timings(response),
+        )
+    except CircuitOpenError:
+        retry_in = llm_breaker.snapshot()["retry_in_seconds"] or LLM_BREAKER_RESET_SECONDS
+        raise HTTPException(
+            status_code=503,
+            detail="Chat service is temporarily degraded. Please try again shortly.",
+            headers={"Retry-After": str(int(retry_in) + 1)},
+        )
+    except asyncio.TimeoutError:
+        print(f"ERROR during Ollama chat call: deadline of {LLM_CHAT_TIMEOUT_SECONDS}s exceeded.")
+        raise HTTPException(status_code=504, detail="Chat service timed out.")
     except Exception as e:
         print(f"ERROR during Ollama chat call: {e}")
         # Consider more specific error handling if Ollama provides error codes/types
         raise HTTPException(status_code=503, detail="Chat service unavailable or encountered an error.")
 
+def require_profiling_token(token: Optional[str]):
+    if not profiler.is_authorized(token):
+        raise HTTPException(status_code=403, detail="Profiling is disabled or the token is invalid.")
+
+@app.get("/profiles", include_in_schema=False)
+async def list_profiles(x_profile_token: Optional[str] = Header(None)):
+    require_profiling_token(x_profile_token)
+    return {"profiles": profiler.list_recent()}
+
+@app.get("/profiles/{profile_id}", include_in_schema=False)
+async def get_profile(
+    profile_id: str,
+    format: Literal["speedscope", "collapsed"] = Query("speedscope"),
+    kind: Literal["wall", "cpu"] = Query("wall"),
+    x_profile_token: Optional[str] = Header(None),
+):
+    require_profiling_token(x_profile_token)
+    entry = profiler.get(profile_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Profile not found.")
+    if format == "collapsed":
+        return PlainTextResponse(entry["_profile"].to_collapsed(kind))
+    return FileResponse(os.path.join(PROFILES_DIR, entry["file"]), media_type="application/json", filename=entry["file"])
+
 @app.get("/", include_in_schema=False) # Basic health check
 async def root_health_check():
-  return {"message": f"Smooth Migration LLM Backend ({LLM_MODEL_NAME}) is healthy and running!"}
+  breaker = llm_breaker.snapshot()
+  status = "healthy" if breaker["state"] == "closed" else "degraded"
+  return {
+      "message": f"Smooth Migration LLM Backend ({LLM_MODEL_NAME}) is {status} and running!",
+      "status": status,
+      "llm_circuit_breaker": breaker,
+      "llm_routing": model_router.snapshot(),
+      "llm_nodes": llm_pool.snapshot(),
+      "personalization_cache": personalization_cache.snapshot(),
+  }
 
 # --- Main Execution (for direct run) ---
 if __name__ == "__main__":
@@ -0,0 +1,124 @@
+# src/backend/model_router.py
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+
+@dataclass
+class WorkloadProfile:
+    """How one kind of LLM work (personalization, chat) is served."""
+    model: str
+    fallback_model: str
+    options: Dict[str, Any] = field(default_factory=dict)
+    think: bool = True  # False appends the no-think directive: reasoning tokens would be discarded anyway
+    downgrade_latency_seconds: float = 10.0
+
+
+@dataclass
+class Route:
+    workload: str
+    model: str
+    options: Dict[str, Any]
+    think: bool
+    downgraded: bool
+
+
+class _WorkloadState:
+    def __init__(self) -> None:
+        self.in_flight = 0
+        self.ewma_latency: Optional[float] = None  # Latency of the primary model only
+        self.downgraded_until = 0.0
+        self.served: Dict[str, int] = {}
+
+
+class ModelRouter:
+    """Picks model and options per workload, downgrading to a faster model under load.
+
+    A workload is downgraded when its in-flight requests reach max_in_flight or the primary model's
+    smoothed latency exceeds the profile's downgrade_latency_seconds. The downgrade holds for
+    cooldown_seconds, after which the primary model is probed again with a fresh latency estimate.
+    """
+
+    def __init__(self, profiles: Dict[str, WorkloadProfile], no_think_directive: str = "/no_think",
+                 max_in_flight: int = 4, cooldown_seconds: float = 30.0, ewma_alpha: float = 0.3):
+        self.profiles = profiles
+        self.no_think_directive = no_think_directive
+        self.max_in_flight = max_in_flight
+        self.cooldown_seconds = cooldown_seconds
+        self.ewma_alpha = ewma_alpha
+        self._states = {name: _WorkloadState() for name in profiles}
+        self._lock = threading.Lock()
+
+    def _choose(self, workload: str) -> Route:
+        profile = self.profiles[workload]
+        state = self._states[workload]
+        now = time.monotonic()
+        downgraded = now < state.downgraded_until
+        if not downgraded and profile.fallback_model != profile.model:
+            overloaded = state.in_flight >= self.max_in_flight
+            too_slow = state.ewma_latency is not None and state.ewma_latency > profile.downgrade_latency_seconds
+            if overloaded or too_slow:
+                reason = f"{state.in_flight} in flight" if overloaded else f"latency {state.ewma_latency:.1f}s"
+                print(f"WARNING: Downgrading '{workload}' to {profile.fallback_model} for {self.cooldown_seconds}s ({reason}).")
+                state.downgraded_until = now + self.cooldown_seconds
+                state.ewma_latency = None
+                downgraded = True
+        model = profile.fallback_model if downgraded else profile.model
+        return Route(workload=workload, model=model, options=dict(profile.options), think=profile.think, downgraded=downgraded)
+
+    @contextmanager
+    def route(self, workload: str) -> Iterator[Route]:
+        """Yields the Route for one call, tracking it as in flight and recording its latency.
+
+        Calls that hit their deadline count too (with the time spent until the deadline), so a primary
+        model that stalls instead of answering slowly still triggers the latency downgrade.
+        """
+        with self._lock:
+            chosen = self._choose(workload)
+            state = self._states[workload]
+            state.in_flight += 1
+        started = time.monotonic()
+        succeeded = timed_out = False
+        try:
+            yield chosen
+            succeeded = True
+        except asyncio.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                state.in_flight -= 1
+                if succeeded:
+                    state.served[chosen.model] = state.served.get(chosen.model, 0) + 1
+                if (succeeded or timed_out) and not chosen.downgraded:
+                    previous = state.ewma_latency
+                    state.ewma_latency = elapsed if previous is None else \
+                        self.ewma_alpha * elapsed + (1 - self.ewma_alpha) * previous
+
+    def apply_think_setting(self, route: Route, messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """Returns messages with the no-think directive appended to the last user turn when thinking is off."""
+        if route.think or not self.no_think_directive or not messages or messages[-1].get('role') != 'user':
+            return messages
+        last = dict(messages[-1])
+        last['content'] = f"{last['content']} {self.no_think_directive}"
+        return messages[:-1] + [last]
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                name: {
+                    "model": self.profiles[name].model,
+                    "fallback_model": self.profiles[name].fallback_model,
+                    "think": self.profiles[name].think,
+                    "downgraded": now < state.downgraded_until,
+                    "in_flight": state.in_flight,
+                    "ewma_latency_seconds": round(state.ewma_latency, 2) if state.ewma_latency is not None else None,
+                    "served": dict(state.served),
+                }
+                for name, state in self._states.items()
+            }
@@ -17,6 +17,7 @@ class ProcessedRelocationTask(BaseModel):
     recommended_services: List[ServiceRecommendation]
     stage: str
     category: str
+    llm_model: Optional[str] = None  # Model that personalized importance_explanation (None = base text)
 
     @field_validator('priority')
     def validate_priority(cls, value):
@@ -55,6 +56,18 @@ class UpdateTaskStatePayload(BaseModel):
     task_description: Optional[str] = None  # Allow editing description
     due_date: Optional[str] = None         # Allow editing due date
 
+# Single entry of a bulk state update (PATCH /checklist)
+class BulkTaskStateUpdate(UpdateTaskStatePayload):
+    task_id: str
+
+# Payload for applying many task state changes in one round-trip
+class BulkUpdateTaskStatePayload(BaseModel):
+    updates: List[BulkTaskStateUpdate]
+
+class BulkUpdateResponse(BaseModel):
+    updated: List[str]
+    missing: List[str]
+
 # Payload for creating a new custom task (POST request)
 class CustomTaskPayload(BaseModel):
     task_description: str
@@ -79,10 +92,19 @@ class QuizFormData(BaseModel):
 # For Chat endpoint
 class ChatPayload(BaseModel):
     message: str
-    history: List[Dict[str, str]] = []
+    history: List[Dict[str, str]] = []    # Expecting list of {'role': '...', 'content': '...'}
+    session_id: Optional[str] = None      # Server-held history; the client then sends only the new message
+    user_id: Optional[str] = None         # Ground answers in this user's saved checklist
+    task_ids: Optional[List[str]] = None  # Or in an explicit list of checklist task_ids
+    destination: Optional[str] = None     # Fills [Destination Country]-style placeholders in that context
 
 class ChatResponse(BaseModel):
     response: str
+    context_ids: List[str] = []  # Task/service ids whose snippets were injected into the prompt
+    session_id: Optional[str] = None
+    model: Optional[str] = None  # Model that served this reply
+    model_downgraded: bool = False
+    timings: Dict[str, Any] = {}  # Ollama prefill/generation counts and durations (ms)
 
 # Structure returned by GET /checklist
 class ChecklistApiResponse(BaseModel):
@@ -0,0 +1,296 @@
+# src/backend/profiling.py
+"""Opt-in per-request profiling that writes speedscope flame graphs.
+
+A profiled request records two views:
+  * "wall" - named spans (LLM calls, applicability checks, service matching, serialization) timed in
+    wall-clock milliseconds, so time spent awaiting Ollama shows up even though no CPU is used.
+  * "cpu"  - periodic samples of the event loop thread's Python stack, nested under the span that
+    was active when the sample was taken.
+
+When no profile is active, profile_span() costs one ContextVar lookup.
+
+Limitation: the CPU sampler sees the whole event loop thread, not just the profiled request. Samples
+taken while the loop runs another request (profiled or not) are still recorded under this profile's
+current span, so the "cpu" view is only trustworthy when the request ran alone. Each profile reports
+overlapping_requests (HTTP requests that were in flight at the same time); treat its CPU view as
+approximate when that is non-zero. For the same reason, concurrent tasks inside one request (parallel
+personalization calls in progressive mode) share the profile's current span: a CPU sample is filed under
+whichever span was entered or left most recently, not necessarily the one that was running. The "wall"
+spans are tracked per task in a ContextVar and are unaffected.
+"""
+import asyncio
+import contextvars
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+_active_profile: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar("_active_profile", default=None)
+_span_stack: contextvars.ContextVar[Tuple[str, ...]] = contextvars.ContextVar("_span_stack", default=())
+
+_NULL_SPAN = nullcontext()
+_IDLE_LEAVES = {"select", "poll", "epoll", "_run_once", "run_forever"}  # Event loop waiting for I/O
+
+
+class RequestProfile:
+    def __init__(self, profile_id: str, label: str, loop_thread_id: int, sample_interval: float):
+        self.profile_id = profile_id
+        self.label = label
+        self.loop_thread_id = loop_thread_id
+        self.sample_interval = sample_interval
+        self.started_at = time.time()
+        self.duration_ms = 0.0
+        self.span_totals: Dict[Tuple[str, ...], float] = {}  # span path -> total wall ms
+        self.cpu_samples: Dict[Tuple[str, ...], int] = {}    # span path + python frames -> sample count
+        self.current_path: Tuple[str, ...] = ()              # Span path most recently entered on the loop thread
+        self.overlapping_requests = 0                        # Other HTTP requests in flight while profiling
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    # --- Spans ---
+    def add_span(self, path: Tuple[str, ...], elapsed_ms: float) -> None:
+        with self._lock:
+            self.span_totals[path] = self.span_totals.get(path, 0.0) + elapsed_ms
+
+    # --- CPU sampling ---
+    def start_sampler(self) -> None:
+        self._sampler = threading.Thread(target=self._sample_loop, name=f"profiler-{self.profile_id}", daemon=True)
+        self._sampler.start()
+
+    def _sample_loop(self) -> None:
+        while not self._stop.wait(self.sample_interval):
+            frame = sys._current_frames().get(self.loop_thread_id)
+            if frame is None or frame.f_code.co_name in _IDLE_LEAVES:
+                continue
+            frames: List[str] = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            key = self.current_path + tuple(reversed(frames))
+            with self._lock:
+                self.cpu_samples[key] = self.cpu_samples.get(key, 0) + 1
+
+    def stop(self) -> None:
+        self.duration_ms = (time.time() - self.started_at) * 1000
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join(timeout=1)
+
+    # --- Export ---
+    def wall_self_times(self) -> Dict[Tuple[str, ...], float]:
+        """Converts total time per span path into self time (children subtracted, clamped at 0)."""
+        child_totals: Dict[Tuple[str, ...], float] = {}
+        for path, total in self.span_totals.items():
+            if len(path) > 1:
+                child_totals[path[:-1]] = child_totals.get(path[:-1], 0.0) + total
+        root = (self.label,)
+        self_times = {
+            (root + path): max(0.0, total - child_totals.get(path, 0.0))
+            for path, total in self.span_totals.items()
+        }
+        top_level = sum(total for path, total in self.span_totals.items() if len(path) == 1)
+        self_times[root] = max(0.0, self.duration_ms - top_level)
+        return self_times
+
+    def to_collapsed(self, kind: str = "wall") -> str:
+        """Brendan Gregg collapsed-stack format (one 'frame;frame;frame weight' line per stack)."""
+        stacks = self.wall_self_times() if kind == "wall" else {
+            (self.label,) + path: count for path, count in self.cpu_samples.items()
+        }
+        return "\n".join(f"{';'.join(path)} {max(1, round(weight))}" for path, weight in sorted(stacks.items())) + "\n"
+
+    def to_speedscope(self) -> Dict[str, Any]:
+        frames: List[Dict[str, str]] = []
+        frame_index: Dict[str, int] = {}
+
+        def sampled_profile(name: str, unit: str, stacks: Dict[Tuple[str, ...], float]) -> Dict[str, Any]:
+            samples, weights = [], []
+            for path, weight in stacks.items():
+                if weight <= 0:
+                    continue
+                indices = []
+                for frame_name in path:
+                    if frame_name not in frame_index:
+                        frame_index[frame_name] = len(frames)
+                        frames.append({"name": frame_name})
+                    indices.append(frame_index[frame_name])
+                samples.append(indices)
+                weights.append(weight)
+            return {
+                "type": "sampled", "name": name, "unit": unit,
+                "startValue": 0, "endValue": sum(weights), "samples": samples, "weights": weights,
+            }
+
+        interval_ms = self.sample_interval * 1000
+        cpu_stacks = {(self.label,) + path: count * interval_ms for path, count in self.cpu_samples.items()}
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": f"{self.label} {self.profile_id}",
+            "exporter": "smooth-migration-backend",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": [
+                sampled_profile(f"wall: {self.label}", "milliseconds", self.wall_self_times()),
+                sampled_profile(f"cpu (event loop): {self.label}", "milliseconds", cpu_stacks),
+            ],
+        }
+
+
+@contextmanager
+def _span(profile: RequestProfile, name: str) -> Iterator[None]:
+    parent = _span_stack.get()
+    path = parent + (name,)
+    token = _span_stack.set(path)
+    profile.current_path = path  # Shared by the request's concurrent tasks; only used to file CPU samples
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add_span(path, (time.perf_counter() - started) * 1000)
+        profile.current_path = parent
+        _span_stack.reset(token)
+
+
+def profile_span(name: str):
+    """Context manager timing a named span of the current profiled request (no-op otherwise)."""
+    profile = _active_profile.get()
+    if profile is None:
+        return _NULL_SPAN
+    return _span(profile, name)
+
+
+class Profiler:
+    """Decides which requests to profile, runs them under a RequestProfile and keeps recent results."""
+
+    def __init__(self, output_dir: str, token: Optional[str], sample_rate: float = 0.0,
+                 sample_interval: float = 0.002, max_recent: int = 50):
+        self.output_dir = output_dir
+        self.token = token
+        self.sample_rate = sample_rate
+        self.sample_interval = sample_interval
+        self.max_recent = max_recent
+        self.recent: Deque[Dict[str, Any]] = deque()
+        self.in_flight_requests = 0
+        self._active: List[RequestProfile] = []
+
+    def request_started(self) -> None:
+        """Counts an HTTP request so overlapping profiles can flag their CPU view as shared."""
+        self.in_flight_requests += 1
+        for profile in self._active:
+            profile.overlapping_requests += 1
+
+    def request_finished(self) -> None:
+        self.in_flight_requests -= 1
+
+    def is_authorized(self, provided_token: Optional[str]) -> bool:
+        if not self.token or provided_token is None:
+            return False
+        return hmac.compare_digest(provided_token.encode(), self.token.encode())
+
+    def should_profile(self, header_value: Optional[str], provided_token: Optional[str]) -> bool:
+        if header_value and header_value.lower() in ("1", "true") and self.is_authorized(provided_token):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self, label: str) -> Tuple[RequestProfile, contextvars.Token]:
+        profile = RequestProfile(uuid.uuid4().hex[:12], label, threading.get_ident(), self.sample_interval)
+        profile.overlapping_requests = self.in_flight_requests - 1  # Already running, excluding this one
+        self._active.append(profile)
+        token = _active_profile.set(profile)
+        profile.start_sampler()
+        return profile, token
+
+    def _write(self, profile: RequestProfile, file_name: str) -> None:
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(os.path.join(self.output_dir, file_name), "w", encoding="utf-8") as f:
+            json.dump(profile.to_speedscope(), f)
+
+    def _remove(self, file_names: List[str]) -> None:
+        for file_name in file_names:
+            try:
+                os.remove(os.path.join(self.output_dir, file_name))
+            except FileNotFoundError:
+                pass
+
+    async def finish(self, profile: RequestProfile, token: contextvars.Token, status_code: Optional[int]) -> Dict[str, Any]:
+        profile.stop()
+        _active_profile.reset(token)
+        self._active.remove(profile)
+        file_name = f"{int(profile.started_at)}_{profile.profile_id}.speedscope.json"
+        # Serializing and writing the file is blocking work; keep it off the event loop
+        await asyncio.to_thread(self._write, profile, file_name)
+        entry = {
+            "profile_id": profile.profile_id,
+            "label": profile.label,
+            "status_code": status_code,
+            "started_at": profile.started_at,
+            "duration_ms": round(profile.duration_ms, 1),
+            "overlapping_requests": profile.overlapping_requests,
+            "file": file_name,
+            "_profile": profile,
+        }
+        self.recent.appendleft(entry)
+        # Only the most recent profiles are kept, in memory and on disk
+        evicted = [self.recent.pop()["file"] for _ in range(len(self.recent) - self.max_recent)]
+        if evicted:
+            await asyncio.to_thread(self._remove, evicted)
+        print(f"Profiled {profile.label} in {entry['duration_ms']}ms -> {file_name}")
+        return entry
+
+    def list_recent(self) -> List[Dict[str, Any]]:
+        return [{k: v for k, v in entry.items() if not k.startswith("_")} for entry in self.recent]
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        return next((entry for entry in self.recent if entry["profile_id"] == profile_id), None)
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles selected requests end to end, including streamed response bodies."""
+
+    def __init__(self, app, profiler: Profiler, paths: Tuple[str, ...]):
+        self.app = app
+        self.profiler = profiler
+        self.paths = paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        self.profiler.request_started()
+        try:
+            await self._handle(scope, receive, send)
+        finally:
+            self.profiler.request_finished()
+
+    async def _handle(self, scope, receive, send):
+        if scope["path"] not in self.paths:
+            return await self.app(scope, receive, send)
+        headers = dict(scope.get("headers") or [])
+        header_value = headers.get(b"x-profile", b"").decode() or None
+        provided_token = headers.get(b"x-profile-token", b"").decode() or None
+        if not self.profiler.should_profile(header_value, provided_token):
+            return await self.app(scope, receive, send)
+
+        profile, token = self.profiler.start(f"{scope['method']} {scope['path']}")
+        status_code: Optional[int] = None
+
+        async def send_with_profile_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message = dict(message)
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile.profile_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            await self.profiler.finish(profile, token, status_code)
@@ -0,0 +1,70 @@
+# src/backend/response_cache.py
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class CoalescingCache:
+    """LRU cache for async results that also coalesces identical in-flight computations.
+
+    Concurrent callers with the same key share one computation instead of each issuing an LLM call.
+    Only results accepted by `cacheable` are stored (e.g. not fallbacks produced while the LLM failed).
+    """
+
+    def __init__(self, max_size: int = 2048):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get_or_compute(self, key: Hashable, compute: Callable[[], Awaitable[Any]],
+                             cacheable: Optional[Callable[[Any], bool]] = None) -> Any:
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        shared = self._in_flight.get(key)
+        if shared is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(shared)
+            except asyncio.CancelledError:
+                if not shared.cancelled():
+                    raise # This caller was cancelled, not the shared computation
+                return await compute() # The leading request went away; compute on our own
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await compute()
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception() # Mark retrieved so an unawaited future doesn't log a warning
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+
+        future.set_result(result)
+        if cacheable is None or cacheable(result):
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 3) if lookups else None,
+        }
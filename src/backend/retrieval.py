@@ -0,0 +1,108 @@
+# src/backend/retrieval.py
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "before", "by", "can", "do", "for", "from", "get",
+    "how", "i", "if", "in", "into", "is", "it", "its", "my", "of", "on", "or", "so", "that",
+    "the", "their", "this", "to", "what", "when", "where", "which", "will", "with", "you", "your",
+}
+
+MAX_SNIPPET_CHARS = 400
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercases and splits text into alphanumeric tokens, dropping stopwords."""
+    return [tok for tok in _TOKEN_RE.findall(text.lower()) if tok not in _STOPWORDS]
+
+
+def _clip(text: str, limit: int = MAX_SNIPPET_CHARS) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 3].rstrip() + "..."
+
+
+class RetrievalIndex:
+    """In-memory BM25 index over task templates and services, built once at load."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_ids: List[str] = []
+        self.doc_kinds: List[str] = []
+        self.snippets: List[str] = []
+        self.doc_lengths: List[int] = []
+        self.avg_doc_length = 0.0
+        # term -> list of (doc_index, term_frequency)
+        self.postings: Dict[str, List[tuple]] = {}
+        self.idf: Dict[str, float] = {}
+
+    def _add_document(self, doc_id: str, kind: str, text: str, snippet: str) -> None:
+        doc_index = len(self.doc_ids)
+        term_counts = Counter(tokenize(text))
+        self.doc_ids.append(doc_id)
+        self.doc_kinds.append(kind)
+        self.snippets.append(snippet)
+        self.doc_lengths.append(sum(term_counts.values()))
+        for term, tf in term_counts.items():
+            self.postings.setdefault(term, []).append((doc_index, tf))
+
+    def build(self, task_templates: Iterable[Dict[str, Any]], services: Iterable[Dict[str, Any]]) -> None:
+        """Indexes task_description/base_importance_explanation of tasks and name/description/keywords of services."""
+        for task in task_templates:
+            task_id = task.get("task_id")
+            if not task_id:
+                continue
+            description = task.get("task_description", "")
+            explanation = task.get("base_importance_explanation", "")
+            snippet = _clip(
+                f"Task ({task.get('stage', 'unknown')}, {task.get('priority', 'Low')} priority, "
+                f"due {task.get('due_date', 'as soon as possible')}): {description} Why: {explanation}"
+            )
+            self._add_document(task_id, "task", f"{description} {explanation}", snippet)
+
+        for service in services:
+            service_id = service.get("id")
+            if not service_id:
+                continue
+            keywords = [k for k in service.get("keywords", []) if isinstance(k, str)]
+            snippet = _clip(
+                f"Service '{service.get('name', service_id)}': {service.get('description', '')} "
+                f"Link: {service.get('url', '')}"
+            )
+            text = f"{service.get('name', '')} {service.get('description', '')} {' '.join(keywords)}"
+            self._add_document(service_id, "service", text, snippet)
+
+        doc_count = len(self.doc_ids)
+        self.avg_doc_length = (sum(self.doc_lengths) / doc_count) if doc_count else 0.0
+        for term, postings in self.postings.items():
+            df = len(postings)
+            self.idf[term] = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+        print(f"Built retrieval index: {doc_count} documents, {len(self.postings)} terms.")
+
+    def search(self, query: str, top_k: int = 4, allowed_task_ids: Optional[Set[str]] = None) -> List[Dict[str, Any]]:
+        """Returns the top_k documents for query. If allowed_task_ids is given, task hits are restricted to it."""
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_index, tf in self.postings[term]:
+                if allowed_task_ids is not None and self.doc_kinds[doc_index] == "task" \
+                        and self.doc_ids[doc_index] not in allowed_task_ids:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_index] / (self.avg_doc_length or 1))
+                scores[doc_index] = scores.get(doc_index, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [
+            {
+                "id": self.doc_ids[doc_index],
+                "kind": self.doc_kinds[doc_index],
+                "score": round(score, 4),
+                "snippet": self.snippets[doc_index],
+            }
+            for doc_index, score in ranked
+        ]
@@ -0,0 +1,6 @@
+# src/backend/tests/conftest.py
+import os
+import sys
+
+# Backend modules are imported flat (as uvicorn runs them from src/backend)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
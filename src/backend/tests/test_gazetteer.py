@@ -0,0 +1,35 @@
+# src/backend/tests/test_gazetteer.py
+import os
+
+import pytest
+import yaml
+
+from gazetteer import Gazetteer
+
+GAZETTEER_DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Checklists', 'gazetteer.yaml')
+
+
+@pytest.fixture(scope="module")
+def gazetteer() -> Gazetteer:
+    with open(GAZETTEER_DATA_PATH, 'r', encoding='utf-8') as f:
+        return Gazetteer(yaml.safe_load(f))
+
+
+@pytest.mark.parametrize("text", ["Germany", " germany ", "DE", "Deutschland", "DEU"])
+def test_country_spellings_share_a_key(gazetteer, text):
+    assert gazetteer.canonicalize(text).key == "DE"
+
+
+@pytest.mark.parametrize("text, key", [
+    ("Berlin, Germany", "DE/berlin"),
+    ("Austin, TX", "US/austin"),
+    ("Washington, DC", "US/washington dc"),
+    ("Tbilisi, Georgia", "GE/tbilisi"),
+])
+def test_city_wins_over_its_state_or_country(gazetteer, text, key):
+    assert gazetteer.canonicalize(text).key == key
+
+
+@pytest.mark.parametrize("text", ["Portland, OR", "Paris, Texas", "Germny", "", None])
+def test_unlisted_or_misspelled_input_is_not_guessed(gazetteer, text):
+    assert gazetteer.canonicalize(text) is None
@@ -0,0 +1,105 @@
+# src/backend/tests/test_llm_guard.py
+import asyncio
+import threading
+import time
+
+import pytest
+
+from llm_guard import CircuitBreaker, CircuitOpenError, guarded_llm_call
+
+
+def open_breaker(reset_timeout: float = 0.05) -> CircuitBreaker:
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=reset_timeout)
+    breaker.record_failure("boom")
+    assert breaker.state == "open"
+    return breaker
+
+
+def test_opens_after_threshold_and_rejects():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+    breaker.record_failure("one")
+    assert breaker.state == "closed"
+    breaker.record_failure("two")
+    assert breaker.is_open
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(guarded_llm_call(breaker, lambda: "unused", timeout=1))
+    assert breaker.snapshot()["total_rejected"] == 1
+
+
+def test_half_open_allows_a_single_trial():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    assert breaker.is_open
+    breaker.record_success()
+    assert breaker.state == "closed" and not breaker.is_open
+
+
+def test_failed_trial_reopens():
+    breaker = open_breaker()
+    time.sleep(0.06)
+
+    def fail():
+        raise RuntimeError("still down")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(guarded_llm_call(breaker, fail, timeout=1))
+    assert breaker.state == "open"
+
+
+def test_cancelled_trial_is_released():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    release = threading.Event()
+
+    async def cancel_trial():
+        call = asyncio.create_task(guarded_llm_call(breaker, release.wait, timeout=5))
+        await asyncio.sleep(0.05)
+        assert breaker.state == "half_open" and breaker.is_open
+        call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call
+        release.set()
+
+    asyncio.run(cancel_trial())
+    # The cancellation is neither a failure nor a success; the next call becomes the trial
+    assert breaker.state == "half_open"
+    assert breaker.snapshot()["total_failures"] == 1
+    assert not breaker.is_open
+    assert asyncio.run(guarded_llm_call(breaker, lambda: "ok", timeout=1)) == "ok"
+    assert breaker.state == "closed"
+
+
+def test_cancelled_call_while_closed_counts_nothing():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=60)
+    release = threading.Event()
+
+    async def cancel_call():
+        call = asyncio.create_task(guarded_llm_call(breaker, release.wait, timeout=5))
+        await asyncio.sleep(0.05)
+        call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call
+        release.set()
+
+    asyncio.run(cancel_call())
+    assert breaker.state == "closed"
+    assert breaker.snapshot()["total_failures"] == 0
+
+
+def test_unreported_outcome_leaves_breaker_alone():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.05)
+
+    def fail():
+        raise RuntimeError("model not found")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(guarded_llm_call(breaker, fail, timeout=1, report_outcome=False))
+    assert breaker.state == "closed"
+
+    breaker.record_failure("primary down")
+    time.sleep(0.06)
+    assert asyncio.run(guarded_llm_call(breaker, lambda: "ok", timeout=1, report_outcome=False)) == "ok"
+    # Still half-open, and the trial was handed back for a call that does report
+    assert breaker.state == "half_open" and not breaker.is_open